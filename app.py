@@ -1,10 +1,32 @@
 import re
 import click
 import os
+import queue
+import random
+import select
+import shlex
+import shutil
+import signal
 import datetime
+import hashlib
+import importlib.util
+import io
+import math
+import sqlite3
+import subprocess
+import tempfile
+import threading
+import time
 import yaml
-from flask import request, jsonify, send_from_directory
-from bs4 import BeautifulSoup
+import zipfile
+from array import array
+from collections import OrderedDict, deque, namedtuple
+from types import MappingProxyType
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from flask import request, jsonify, send_from_directory, session
+import soupsieve
+from bs4 import BeautifulSoup, Doctype
 from werkzeug.utils import secure_filename
 
 # ... (rest of your imports) ...
@@ -12,6 +34,8 @@ import json
 import markdown
 from flask import Flask, render_template, url_for, flash, redirect, jsonify, request # <-- ADD request
 from flask_sqlalchemy import SQLAlchemy
+from sqlalchemy import func, insert, text
+from sqlalchemy.exc import IntegrityError
 from flask_bcrypt import Bcrypt
 from flask_login import LoginManager, UserMixin, login_user, current_user, logout_user, login_required
 from flask_migrate import Migrate
@@ -32,6 +56,57 @@ app.config['SECRET_KEY'] = os.urandom(24)
 app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///site.db'
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'static/uploads/profile_pics'
+# Rendered markdown notes kept in memory (entries), plus an optional on-disk tier
+app.config['NOTE_CACHE_SIZE'] = 512
+app.config['NOTE_CACHE_DIR'] = None # e.g. os.path.join(app.instance_path, 'note_cache')
+# Pre-serialized quiz pages kept in memory (entries), plus an optional on-disk tier
+app.config['QUIZ_CACHE_SIZE'] = 256
+app.config['QUIZ_CACHE_DIR'] = None # e.g. os.path.join(app.instance_path, 'quiz_cache')
+# Seconds a cached content -> ModuleItem placement lookup stays valid in other workers
+app.config['CONTENT_PLACEMENT_TTL'] = 30
+# Compiled lab step metadata kept in memory (labs), and how long other workers may reuse it (seconds)
+app.config['LAB_CACHE_SIZE'] = 256
+app.config['LAB_CACHE_TTL'] = 300
+# Compiled practical session validation plans kept in memory (sessions), and their lifetime in other workers (seconds)
+app.config['SESSION_PLAN_CACHE_SIZE'] = 256
+app.config['SESSION_PLAN_CACHE_TTL'] = 300
+# Tree builder used to parse session submissions: 'html.parser' (built in) or 'lxml' (faster,
+# needs the lxml package). Run 'flask benchmark-html-parsers' on real submissions before switching.
+app.config['SESSION_HTML_PARSER'] = 'html.parser'
+# JavaScript/backend submissions each run in a fresh, sandboxed Node.js process;
+# CODE_RUNNER_WORKERS is how many may run at once per web worker
+app.config['CODE_RUNNER_WORKERS'] = min(4, os.cpu_count() or 1)
+app.config['CODE_RUNNER_NODE'] = 'node'
+app.config['CODE_RUNNER_TIMEOUT'] = 5 # wall-clock seconds per submission
+app.config['CODE_RUNNER_CPU_SECONDS'] = 1 # CPU time per submission (the code and all of its checks)
+app.config['CODE_RUNNER_MEMORY_MB'] = 64 # V8 heap cap per runner process; typed arrays and buffers share a cap of this plus 128 MB
+# Node's permission model flag: '--experimental-permission' (Node 20/21), '--permission' (Node 22+), None to disable
+app.config['CODE_RUNNER_PERMISSION_FLAG'] = '--experimental-permission'
+# Session grading: 'sync' grades inside the request; 'queue' stores a GradingJob, returns its id
+# and lets grading workers (GRADING_WORKERS threads per web worker and/or 'flask grading-worker') run it
+app.config['SESSION_GRADING_MODE'] = 'sync'
+app.config['GRADING_WORKERS'] = 2
+app.config['GRADING_QUEUE_MAX_DEPTH'] = 200 # queued jobs beyond this are refused with 503
+app.config['GRADING_POLL_INTERVAL'] = 1.0 # seconds an idle worker waits before looking for jobs from other processes
+app.config['GRADING_JOB_TIMEOUT'] = 60 # a job running longer than this is assumed lost and retried
+app.config['GRADING_JOB_RETENTION'] = 3600 # seconds finished jobs are kept for polling
+# Threads used to list directories when importing a curriculum tree
+app.config['CURRICULUM_SCAN_WORKERS'] = 8
+# Processes used to parse quiz/lab/session files during a bulk content import
+app.config['CONTENT_IMPORT_WORKERS'] = 4
+app.config['CONTENT_IMPORT_MAX_FILE_SIZE'] = 5 * 1024 * 1024
+# Quiz attempt lockout: at most QUIZ_ATTEMPT_LIMIT submissions per quiz within a sliding
+# QUIZ_ATTEMPT_WINDOW (seconds). The counter backend is 'memory' (this process only, so the
+# limit is multiplied by the number of web workers), 'sqlite' (shared by the workers of one
+# host) or 'redis' (any Redis-compatible server).
+app.config['QUIZ_ATTEMPT_LIMIT'] = 1
+app.config['QUIZ_ATTEMPT_WINDOW'] = 60
+# Answer checks (check_answer, /api/quiz/<id>/grade) per quiz and window, counted apart from submissions
+app.config['QUIZ_CHECK_LIMIT'] = 10
+app.config['QUIZ_ATTEMPT_BACKEND'] = 'memory'
+app.config['QUIZ_ATTEMPT_BACKEND_URL'] = None # sqlite file path or redis:// URL
+# Number of recent quiz attempts kept in each learner's UserStats row for the dashboard
+app.config['DASHBOARD_RECENT_ATTEMPTS'] = 3
 
 # Initialize Extensions
 db = SQLAlchemy(app)
@@ -59,59 +134,1542 @@ def get_user_progress_map(user_id):
     progress_records = UserProgress.query.filter_by(user_id=user_id).all()
     return {record.module_item_id: record.status for record in progress_records}
 
-def calculate_module_progress(module, user_progress_map):
+def get_module_progress_counts(user_id):
     """
-    Calculates the completion percentage for a given module based on user progress.
+    Returns a dictionary mapping module_id to the number of items the user has completed
+    in that module, read from the materialized ModuleProgress counters.
     """
-    total_items = 0
-    completed_items = 0
+    rows = db.session.query(ModuleProgress.module_id, ModuleProgress.completed_items).filter_by(user_id=user_id).all()
+    return {module_id: completed for module_id, completed in rows}
 
-    for submodule in module.submodules:
-        for item in submodule.items:
-            total_items += 1
-            if user_progress_map.get(item.id) == 'completed':
-                completed_items += 1
-    
-    if total_items == 0:
+def calculate_module_progress(module, module_progress_counts):
+    """
+    Calculates the completion percentage for a given module from the user's
+    materialized progress counters (see get_module_progress_counts).
+    """
+    total_items = module.item_count
+    if not total_items:
         return 0
+    completed_items = min(module_progress_counts.get(module.id, 0), total_items)
     return round((completed_items / total_items) * 100)
 
-def parse_quiz_markdown(markdown_text):
+def register_module_items(module_id, count=1):
     """
-    Parses a string of markdown text and returns a list of question dictionaries.
-    Returns None if there is a parsing error.
+    Bumps the cached item count of a module after ModuleItems were added to it.
+    The caller is responsible for committing.
     """
-    # ... (the full code for this function)
-    questions = []
-    question_blocks = markdown_text.strip().split('# Question ')
-    
-    for block in question_blocks:
-        if not block.strip():
-            continue
+    if not module_id or not count:
+        return
+    Module.query.filter_by(id=module_id).update(
+        {Module.item_count: Module.item_count + count}, synchronize_session=False
+    )
+
+def release_module_items(item_ids):
+    """
+    Keeps the module item counts and the per-user ModuleProgress counters in step
+    with ModuleItems that are about to be deleted. Must be called *before* the rows
+    are removed. The caller is responsible for committing.
+    """
+    item_ids = list(item_ids)
+    if not item_ids:
+        return
+
+    removed_per_module = db.session.query(Submodule.module_id, func.count(ModuleItem.id)) \
+        .join(ModuleItem, ModuleItem.submodule_id == Submodule.id) \
+        .filter(ModuleItem.id.in_(item_ids)) \
+        .group_by(Submodule.module_id).all()
+    for module_id, count in removed_per_module:
+        Module.query.filter_by(id=module_id).update(
+            {Module.item_count: Module.item_count - count}, synchronize_session=False
+        )
+
+    completed_per_user = db.session.query(UserProgress.user_id, Submodule.module_id, func.count(UserProgress.id)) \
+        .join(ModuleItem, UserProgress.module_item_id == ModuleItem.id) \
+        .join(Submodule, ModuleItem.submodule_id == Submodule.id) \
+        .filter(ModuleItem.id.in_(item_ids), UserProgress.status == 'completed') \
+        .group_by(UserProgress.user_id, Submodule.module_id).all()
+    for user_id, module_id, count in completed_per_user:
+        ModuleProgress.query.filter_by(user_id=user_id, module_id=module_id).update(
+            {ModuleProgress.completed_items: ModuleProgress.completed_items - count}, synchronize_session=False
+        )
+
+def rebuild_module_progress():
+    """
+    Recomputes every module's item count and every ModuleProgress counter from
+    scratch with two aggregate queries. Used after bulk structural changes
+    (e.g. automate-curriculum) and by the rebuild-progress CLI command.
+    The caller is responsible for committing.
+    """
+    item_counts = dict(
+        db.session.query(Submodule.module_id, func.count(ModuleItem.id))
+        .join(ModuleItem, ModuleItem.submodule_id == Submodule.id)
+        .group_by(Submodule.module_id).all()
+    )
+    for module in Module.query.all():
+        module.item_count = item_counts.get(module.id, 0)
+
+    ModuleProgress.query.delete()
+    completed_rows = db.session.query(UserProgress.user_id, Submodule.module_id, func.count(UserProgress.id)) \
+        .join(ModuleItem, UserProgress.module_item_id == ModuleItem.id) \
+        .join(Submodule, ModuleItem.submodule_id == Submodule.id) \
+        .filter(UserProgress.status == 'completed') \
+        .group_by(UserProgress.user_id, Submodule.module_id).all()
+    db.session.add_all([
+        ModuleProgress(user_id=user_id, module_id=module_id, completed_items=completed)
+        for user_id, module_id, completed in completed_rows if module_id is not None
+    ])
+
+RecentAttempt = namedtuple('RecentAttempt', 'quiz_id quiz_title quiz_category score passed timestamp')
+
+def recent_attempt_entry(attempt, quiz_title, quiz_category):
+    """Serializes a quiz attempt for the recent_attempts list of a UserStats row."""
+    return {
+        'quiz_id': attempt.quiz_id,
+        'quiz_title': quiz_title,
+        'quiz_category': quiz_category,
+        'score': attempt.score,
+        'passed': attempt.passed,
+        'timestamp': attempt.timestamp.isoformat(),
+    }
+
+def record_quiz_attempt_stats(attempt, quiz_title, quiz_category):
+    """
+    Folds a new, not yet flushed quiz attempt into the learner's UserStats row.
+    The attempt counter is bumped first, which locks the row until commit, so
+    concurrent submissions by the same learner are serialized and the
+    first-attempt/first-pass check below sees every earlier attempt.
+    The caller is responsible for committing.
+    """
+    user_id = attempt.user_id
+    if attempt.timestamp is None:
+        attempt.timestamp = datetime.datetime.utcnow()
+
+    def _increment(increments):
+        return UserStats.query.filter_by(user_id=user_id).update(increments, synchronize_session=False)
+
+    bump_attempts = {UserStats.attempt_count: UserStats.attempt_count + 1}
+    if not _increment(bump_attempts):
         try:
-            lines = block.strip().split('\n')
-            question_line = lines[0]
-            question_text = question_line.split(':', 1)[1].strip()
-            options = [line.split(':', 1)[1].strip() for line in lines[1:5]]
-            answer_line = lines[5]
-            answer_str = answer_line.split('option')[1].strip()
-            correct_option_index = int(answer_str) - 1
-            if not (0 <= correct_option_index < 4):
-                return None
-            question_data = {
-                'question_text': question_text,
-                'options': options,
-                'correct_index': correct_option_index
+            with db.session.begin_nested():
+                db.session.add(UserStats(user_id=user_id, quizzes_taken=0, quizzes_passed=0, attempt_count=0, recent_attempts='[]'))
+        except IntegrityError:
+            # A concurrent request created the row first
+            pass
+        _increment(bump_attempts)
+
+    # One seek on ix_quiz_attempt_user_quiz, made while the row lock is held
+    previous = db.session.query(QuizAttempt.passed) \
+        .filter_by(user_id=user_id, quiz_id=attempt.quiz_id) \
+        .order_by(QuizAttempt.passed.desc()).first()
+    increments = {}
+    if previous is None:
+        increments[UserStats.quizzes_taken] = UserStats.quizzes_taken + 1
+    if attempt.passed and not (previous and previous.passed):
+        increments[UserStats.quizzes_passed] = UserStats.quizzes_passed + 1
+
+    recent_json = db.session.query(UserStats.recent_attempts).filter_by(user_id=user_id).scalar()
+    recent = [recent_attempt_entry(attempt, quiz_title, quiz_category)] + json.loads(recent_json or '[]')
+    increments[UserStats.recent_attempts] = json.dumps(recent[:app.config['DASHBOARD_RECENT_ATTEMPTS']])
+    _increment(increments)
+
+def rebuild_user_stats(user_ids=None):
+    """
+    Recomputes UserStats rows from the QuizAttempt history with two aggregate
+    queries, for the given users or for everyone. Used after quiz deletions and
+    by the rebuild-stats CLI command. The caller is responsible for committing.
+    """
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return
+
+    def _scoped(query):
+        return query.filter(QuizAttempt.user_id.in_(user_ids)) if user_ids is not None else query
+
+    totals = _scoped(db.session.query(
+        QuizAttempt.user_id,
+        func.count(func.distinct(QuizAttempt.quiz_id)),
+        func.count(func.distinct(db.case((QuizAttempt.passed, QuizAttempt.quiz_id)))),
+        func.count(QuizAttempt.id)
+    )).group_by(QuizAttempt.user_id).all()
+
+    limit = app.config['DASHBOARD_RECENT_ATTEMPTS']
+    ranked = _scoped(db.session.query(
+        QuizAttempt,
+        func.row_number().over(partition_by=QuizAttempt.user_id,
+                               order_by=(QuizAttempt.timestamp.desc(), QuizAttempt.id.desc())).label('rank')
+    )).subquery()
+    ranked_attempt = db.aliased(QuizAttempt, ranked)
+    recent_rows = db.session.query(ranked_attempt, Quiz.title, Quiz.category) \
+        .join(Quiz, Quiz.id == ranked_attempt.quiz_id) \
+        .filter(ranked.c.rank <= limit) \
+        .order_by(ranked_attempt.user_id, ranked.c.rank).all()
+    recent = {}
+    for attempt, title, category in recent_rows:
+        recent.setdefault(attempt.user_id, []).append(recent_attempt_entry(attempt, title, category))
+
+    stats_query = UserStats.query
+    if user_ids is not None:
+        stats_query = stats_query.filter(UserStats.user_id.in_(user_ids))
+    existing = {stats.user_id: stats for stats in stats_query.all()}
+    for user_id, taken, passed, count in totals:
+        stats = existing.pop(user_id, None)
+        if stats is None:
+            stats = UserStats(user_id=user_id)
+            db.session.add(stats)
+        stats.quizzes_taken, stats.quizzes_passed, stats.attempt_count = taken, passed, count
+        stats.recent_attempts = json.dumps(recent.get(user_id, []))
+    # Users whose attempts are all gone fall back to the empty dashboard
+    for stats in existing.values():
+        db.session.delete(stats)
+
+def note_title_from_path(content_path):
+    """
+    Derives a display title for a markdown note from its file name.
+    """
+    return os.path.splitext(os.path.basename(content_path))[0].replace('_', ' ').title()
+
+class CourseTreeNode:
+    """
+    Lightweight, read-only stand-in for a Module, Submodule or ModuleItem row.
+    Built by load_course_tree so templates can walk the course without
+    triggering lazy relationship loads.
+    """
+    def __init__(self, **fields):
+        self.__dict__.update(fields)
+
+    def __repr__(self):
+        return f"CourseTreeNode({self.__dict__.get('title', self.__dict__.get('id'))})"
+
+def load_course_tree(modules):
+    """
+    Loads the submodules (including nested children), module items and the
+    titles of the quizzes, labs and sessions they point to for the given modules
+    using a fixed number of bulk queries, independent of the course size.
+    Returns a list of CourseTreeNode objects mirroring the attributes the course
+    templates use (module.submodules, submodule.items, submodule.children,
+    item.content_object).
+    """
+    module_ids = [module.id for module in modules]
+    if not module_ids:
+        return []
+
+    submodules = Submodule.query.filter(Submodule.module_id.in_(module_ids)) \
+        .order_by(Submodule.order.asc(), Submodule.id.asc()).all()
+    submodule_ids = [submodule.id for submodule in submodules]
+    items = ModuleItem.query.filter(ModuleItem.submodule_id.in_(submodule_ids)) \
+        .order_by(ModuleItem.order.asc(), ModuleItem.id.asc()).all() if submodule_ids else []
+
+    # One query per content table for all referenced titles
+    content_models = {'quiz': Quiz, 'lab': Lab, 'session': PracticalSession}
+    content_titles = {}
+    for content_type, model in content_models.items():
+        ids = {item.content_id for item in items if item.content_type == content_type and item.content_id is not None}
+        if ids:
+            rows = db.session.query(model.id, model.title).filter(model.id.in_(ids)).all()
+            content_titles[content_type] = dict(rows)
+
+    submodule_nodes = {}
+    for submodule in submodules:
+        submodule_nodes[submodule.id] = CourseTreeNode(
+            id=submodule.id,
+            title=submodule.title,
+            slug=submodule.slug,
+            order=submodule.order,
+            is_published=submodule.is_published,
+            module_id=submodule.module_id,
+            parent_id=submodule.parent_id,
+            items=[],
+            children=[]
+        )
+
+    for item in items:
+        if item.content_type == 'note':
+            content_object = {'title': note_title_from_path(item.content_path), 'path': item.content_path} if item.content_path else None
+        else:
+            title = content_titles.get(item.content_type, {}).get(item.content_id)
+            content_object = CourseTreeNode(id=item.content_id, title=title) if title is not None else None
+        submodule_nodes[item.submodule_id].items.append(CourseTreeNode(
+            id=item.id,
+            order=item.order,
+            is_published=item.is_published,
+            submodule_id=item.submodule_id,
+            content_type=item.content_type,
+            content_id=item.content_id,
+            content_path=item.content_path,
+            content_object=content_object
+        ))
+
+    submodules_by_module = {module_id: [] for module_id in module_ids}
+    for submodule in submodules:
+        node = submodule_nodes[submodule.id]
+        submodules_by_module[submodule.module_id].append(node)
+        if submodule.parent_id in submodule_nodes:
+            submodule_nodes[submodule.parent_id].children.append(node)
+
+    return [
+        CourseTreeNode(
+            id=module.id,
+            title=module.title,
+            slug=module.slug,
+            order=module.order,
+            is_published=module.is_published,
+            item_count=module.item_count,
+            submodules=submodules_by_module[module.id]
+        )
+        for module in modules
+    ]
+
+def rebuild_curriculum_paths():
+    """
+    Rebuilds the CurriculumPath index that maps every full slug path
+    (e.g. 'module/submodule/child/file.md') to the Module, Submodule or
+    ModuleItem it resolves to. Called after any structural edit so that
+    curriculum_viewer can resolve deep links with a single indexed lookup.
+    The caller is responsible for committing.
+    """
+    modules = db.session.query(Module.id, Module.slug).all()
+    submodules = db.session.query(Submodule.id, Submodule.slug, Submodule.module_id, Submodule.parent_id) \
+        .order_by(Submodule.order.asc(), Submodule.id.asc()).all()
+    items = db.session.query(ModuleItem.id, ModuleItem.submodule_id, ModuleItem.content_path) \
+        .filter(ModuleItem.content_path.isnot(None)) \
+        .order_by(ModuleItem.order.asc(), ModuleItem.id.asc()).all()
+
+    module_slugs = {module_id: slug for module_id, slug in modules}
+    submodules_by_id = {row.id: row for row in submodules}
+    submodule_paths = {}
+
+    def _submodule_path(submodule_id, seen=()):
+        if submodule_id in submodule_paths:
+            return submodule_paths[submodule_id]
+        row = submodules_by_id.get(submodule_id)
+        if row is None or submodule_id in seen:
+            return None
+        if row.parent_id is not None:
+            parent_path = _submodule_path(row.parent_id, seen + (submodule_id,))
+        else:
+            parent_path = module_slugs.get(row.module_id)
+        path = f"{parent_path}/{row.slug}" if parent_path else None
+        submodule_paths[submodule_id] = path
+        return path
+
+    entries = {}
+    for module_id, slug in modules:
+        entries[slug] = ('module', module_id, module_id)
+    # Submodules win over items with the same slug, matching the old traversal order.
+    for row in submodules:
+        path = _submodule_path(row.id)
+        if path and path not in entries:
+            entries[path] = ('submodule', row.id, row.module_id)
+    for item_id, submodule_id, content_path in items:
+        parent_path = _submodule_path(submodule_id)
+        if not parent_path:
+            continue
+        path = f"{parent_path}/{os.path.basename(content_path)}"
+        if path not in entries:
+            entries[path] = ('module_item', item_id, submodules_by_id[submodule_id].module_id)
+
+    CurriculumPath.query.delete()
+    if entries:
+        db.session.execute(CurriculumPath.__table__.insert(), [
+            {'path': path, 'entity_type': entity_type, 'entity_id': entity_id, 'module_id': module_id}
+            for path, (entity_type, entity_id, module_id) in entries.items()
+        ])
+
+MARKDOWN_EXTENSIONS = ['fenced_code', 'tables']
+
+def render_markdown(text):
+    """
+    Renders markdown text to HTML with the extensions used across the site.
+    """
+    return markdown.markdown(text, extensions=MARKDOWN_EXTENSIONS)
+
+class NoteCache:
+    """
+    Bounded LRU cache of rendered note HTML keyed by (path, mtime, size), with an
+    optional on-disk tier. A hit costs one os.stat and skips both the file read
+    and the Markdown conversion; editing a note changes its mtime/size and
+    naturally invalidates the old entry.
+    If a compiled_loader is given, it is consulted on a memory miss for an
+    ahead-of-time compiled artifact (see compile_notes) before rendering.
+    """
+    def __init__(self, max_entries=512, cache_dir=None, compiled_loader=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.compiled_loader = compiled_loader
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.compiled_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _disk_path(self, key):
+        digest = hashlib.sha1(repr(key).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.html")
+
+    def _remember(self, key, html):
+        with self._lock:
+            self._entries[key] = html
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def render(self, full_path):
+        """
+        Returns the rendered HTML for the markdown file at full_path.
+        Raises FileNotFoundError if the file does not exist.
+        """
+        stat = os.stat(full_path)
+        key = (full_path, stat.st_mtime_ns, stat.st_size)
+
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+
+        if self.compiled_loader:
+            html = self.compiled_loader(full_path, stat)
+            if html is not None:
+                with self._lock:
+                    self.compiled_hits += 1
+                self._remember(key, html)
+                return html
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(key), 'r', encoding='utf-8') as f:
+                    html = f.read()
+            except OSError:
+                html = None
+            if html is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, html)
+                return html
+
+        with open(full_path, 'r', encoding='utf-8') as f:
+            html = render_markdown(f.read())
+        with self._lock:
+            self.misses += 1
+        self._remember(key, html)
+
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                disk_path = self._disk_path(key)
+                tmp_path = f"{disk_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    f.write(html)
+                os.replace(tmp_path, disk_path)
+            except OSError as e:
+                print(f"Warning: could not write note cache file: {e}")
+        return html
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            served = self.hits + self.compiled_hits + self.disk_hits
+            lookups = served + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'compiled_hits': self.compiled_hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round(served / lookups * 100, 1) if lookups else 0,
+                'disk_tier': bool(self.cache_dir)
             }
-            questions.append(question_data)
-        except (IndexError, ValueError) as e:
-            print(f"Error parsing block: {e}")
+
+def load_compiled_note_html(full_path, stat):
+    """
+    Returns the ahead-of-time compiled HTML for a note if a CompiledNote exists
+    for the same file version (mtime and size), otherwise None.
+    """
+    content_path = os.path.relpath(full_path, app.root_path)
+    row = db.session.query(CompiledNote.html).filter_by(
+        content_path=content_path,
+        file_mtime_ns=stat.st_mtime_ns,
+        file_size=stat.st_size
+    ).first()
+    return row.html if row else None
+
+note_cache = NoteCache(
+    max_entries=app.config['NOTE_CACHE_SIZE'],
+    cache_dir=app.config['NOTE_CACHE_DIR'],
+    compiled_loader=load_compiled_note_html
+)
+
+def extract_note_title(markdown_text, content_path):
+    """
+    Returns the first level-one heading of a note, falling back to a title
+    derived from its file name.
+    """
+    for line in markdown_text.splitlines():
+        if line.startswith('# '):
+            return line[2:].strip()
+    return note_title_from_path(content_path)
+
+def compile_notes(content_paths):
+    """
+    Pre-renders the given markdown notes (paths relative to the app root) into
+    CompiledNote rows holding the rendered HTML, a content hash, the title and
+    the word count. Files whose mtime/size are unchanged are skipped without
+    being read, and files whose content hash is unchanged are not re-rendered.
+    Returns a dictionary of counts. The caller is responsible for committing.
+    """
+    counts = {'compiled': 0, 'unchanged': 0, 'missing': 0}
+    existing = {note.content_path: note for note in CompiledNote.query.all()}
+
+    for content_path in content_paths:
+        full_path = os.path.join(app.root_path, content_path)
+        try:
+            stat = os.stat(full_path)
+        except OSError:
+            counts['missing'] += 1
+            continue
+
+        compiled = existing.get(content_path)
+        if compiled and compiled.file_mtime_ns == stat.st_mtime_ns and compiled.file_size == stat.st_size:
+            counts['unchanged'] += 1
+            continue
+
+        with open(full_path, 'r', encoding='utf-8') as f:
+            markdown_text = f.read()
+        content_hash = hashlib.sha256(markdown_text.encode('utf-8')).hexdigest()
+
+        if compiled and compiled.content_hash == content_hash:
+            # Touched but not edited: refresh the file version, keep the artifact
+            compiled.file_mtime_ns = stat.st_mtime_ns
+            compiled.file_size = stat.st_size
+            counts['unchanged'] += 1
+            continue
+
+        if not compiled:
+            compiled = CompiledNote(content_path=content_path)
+            db.session.add(compiled)
+            existing[content_path] = compiled
+        compiled.content_hash = content_hash
+        compiled.file_mtime_ns = stat.st_mtime_ns
+        compiled.file_size = stat.st_size
+        compiled.title = extract_note_title(markdown_text, content_path)[:255]
+        compiled.word_count = len(markdown_text.split())
+        compiled.html = render_markdown(markdown_text)
+        compiled.compiled_at = datetime.datetime.utcnow()
+        counts['compiled'] += 1
+
+    return counts
+
+def clean_curriculum_name(name):
+    """
+    Turns a curriculum file or directory name into a display title.
+    """
+    # Remove leading numbers and underscores, replace underscores with spaces, title case
+    name = re.sub(r'^\d+_', '', name)
+    return name.replace('_', ' ').replace('-', ' ').title()
+
+def scan_curriculum_tree(root_path, max_workers=None):
+    """
+    Walks a curriculum directory and returns its structure without touching the
+    database. Top-level directories are modules, deeper directories are
+    (nested) submodules and markdown files inside submodules are notes.
+    Directories are listed with os.scandir, one tree level at a time, across a
+    thread pool (CURRICULUM_SCAN_WORKERS threads by default).
+    Returns a dictionary: {'modules': [...], 'skipped': [messages]} where each
+    module is {'slug', 'title', 'order', 'submodules'} and each submodule is
+    {'slug', 'title', 'order', 'children', 'notes'}; notes are
+    {'content_path', 'order'} with paths relative to the app root.
+    """
+    def _list_directory(dir_path):
+        with os.scandir(dir_path) as entries:
+            return sorted((entry.name, entry.is_dir(), entry.path) for entry in entries)
+
+    # Stage 1: list every directory, level by level, in parallel
+    listings = {}
+    pending = [root_path]
+    with ThreadPoolExecutor(max_workers=max_workers or app.config['CURRICULUM_SCAN_WORKERS']) as pool:
+        while pending:
+            next_level = []
+            for dir_path, entries in zip(pending, pool.map(_list_directory, pending)):
+                listings[dir_path] = entries
+                next_level.extend(entry_path for _, is_dir, entry_path in entries if is_dir)
+            pending = next_level
+
+    # Stage 2: shape the listings into the module/submodule/note tree
+    skipped = []
+
+    def _skip(entry_name):
+        if entry_name.endswith('.md'):
+            skipped.append(f"    ! Skipping markdown file '{entry_name}' in module root (must be in a submodule).")
+        else:
+            skipped.append(f"    - Skipping unknown file type: '{entry_name}'")
+
+    def _build_submodule(dir_path, name, order):
+        submodule = {'slug': name, 'title': clean_curriculum_name(name), 'order': order, 'children': [], 'notes': []}
+        for entry_name, is_dir, entry_path in listings[dir_path]:
+            if is_dir:
+                submodule['children'].append(_build_submodule(entry_path, entry_name, len(submodule['children']) + 1))
+            elif entry_name.endswith('.md'):
+                submodule['notes'].append({
+                    'content_path': os.path.relpath(entry_path, app.root_path),
+                    'order': len(submodule['notes']) + 1
+                })
+            else:
+                skipped.append(f"    - Skipping unknown file type: '{entry_name}'")
+        return submodule
+
+    def _build_module(dir_path, name, order):
+        module = {'slug': name, 'title': clean_curriculum_name(name), 'order': order, 'submodules': []}
+        for entry_name, is_dir, entry_path in listings[dir_path]:
+            if is_dir:
+                module['submodules'].append(_build_submodule(entry_path, entry_name, len(module['submodules']) + 1))
+            else:
+                _skip(entry_name)
+        return module
+
+    modules = []
+    for entry_name, is_dir, entry_path in listings[root_path]:
+        if is_dir:
+            modules.append(_build_module(entry_path, entry_name, len(modules) + 1))
+        else:
+            _skip(entry_name)
+    return {'modules': modules, 'skipped': skipped}
+
+def import_curriculum(module_specs):
+    """
+    Inserts a scanned curriculum tree (see scan_curriculum_tree) into empty
+    curriculum tables with bulk executemany INSERTs: one for modules, one per
+    submodule nesting level and one for all notes, however large the tree is.
+    New ids are read back with one SELECT per level and matched on the natural
+    keys (slug within parent), which are unique in a directory tree.
+    Returns a dictionary of row counts. The caller is responsible for committing.
+    """
+    counts = {'modules': 0, 'submodules': 0, 'notes': 0}
+    if not module_specs:
+        return counts
+
+    db.session.execute(insert(Module), [
+        {'title': spec['title'], 'slug': spec['slug'], 'order': spec['order']} for spec in module_specs
+    ])
+    module_ids = dict(db.session.query(Module.slug, Module.id).all())
+    counts['modules'] = len(module_specs)
+
+    note_rows = []
+    level = [(module_ids[spec['slug']], None, sub_spec) for spec in module_specs for sub_spec in spec['submodules']]
+    while level:
+        db.session.execute(insert(Submodule), [
+            {'title': spec['title'], 'slug': spec['slug'], 'order': spec['order'],
+             'module_id': module_id, 'parent_id': parent_id} for module_id, parent_id, spec in level
+        ])
+        parent_filter = Submodule.parent_id.is_(None) if level[0][1] is None \
+            else Submodule.parent_id.in_({parent_id for _, parent_id, _ in level})
+        submodule_ids = {
+            (module_id, parent_id, slug): submodule_id
+            for submodule_id, module_id, parent_id, slug in db.session.query(
+                Submodule.id, Submodule.module_id, Submodule.parent_id, Submodule.slug
+            ).filter(parent_filter).all()
+        }
+        counts['submodules'] += len(level)
+
+        next_level = []
+        for module_id, parent_id, spec in level:
+            submodule_id = submodule_ids[(module_id, parent_id, spec['slug'])]
+            note_rows.extend({'order': note['order'], 'submodule_id': submodule_id, 'content_type': 'note',
+                              'content_id': None, 'content_path': note['content_path']} for note in spec['notes'])
+            next_level.extend((module_id, submodule_id, child_spec) for child_spec in spec['children'])
+        level = next_level
+
+    if note_rows:
+        db.session.execute(insert(ModuleItem), note_rows)
+    counts['notes'] = len(note_rows)
+    return counts
+
+def sync_curriculum(module_specs):
+    """
+    Non-destructively brings the Module/Submodule/ModuleItem rows in line with a
+    scanned curriculum tree (see scan_curriculum_tree). Existing rows are matched
+    by slug (modules, submodules within their parent) and content_path (notes),
+    so their ids, and therefore learner progress, survive a re-import. Only rows
+    that differ are inserted, updated, reordered or deleted. Quiz, lab and
+    session items linked by admins inside a surviving submodule are left alone.
+    Returns a dictionary of change counts. The caller is responsible for
+    committing and for refreshing derived data (progress counters, path index).
+    """
+    counts = {'created': 0, 'updated': 0, 'deleted': 0, 'unchanged': 0}
+
+    existing_modules = {module.slug: module for module in Module.query.all()}
+    existing_submodules = {}
+    for submodule in Submodule.query.all():
+        existing_submodules[(submodule.module_id, submodule.parent_id, submodule.slug)] = submodule
+    existing_notes = {}
+    for item in ModuleItem.query.filter_by(content_type='note').all():
+        existing_notes[(item.submodule_id, item.content_path)] = item
+
+    def _apply(row, **fields):
+        changed = False
+        for field, value in fields.items():
+            if getattr(row, field) != value:
+                setattr(row, field, value)
+                changed = True
+        counts['updated' if changed else 'unchanged'] += 1
+
+    # --- Modules ---
+    wanted_slugs = {spec['slug'] for spec in module_specs}
+    removed_modules = [module for slug, module in existing_modules.items() if slug not in wanted_slugs]
+    for module in removed_modules:
+        click.echo(f"- Removing Module: '{module.title}'")
+        db.session.delete(module)
+        counts['deleted'] += 1
+    # Module.order is unique, so park reordered modules on temporary negative
+    # values before assigning their final positions.
+    for spec in module_specs:
+        module = existing_modules.get(spec['slug'])
+        if module is not None and module.order != spec['order']:
+            module.order = -spec['order']
+    db.session.flush()
+
+    module_rows = []
+    for spec in module_specs:
+        module = existing_modules.get(spec['slug'])
+        if module is None:
+            click.echo(f"+ Creating Module: '{spec['title']}' from '{spec['slug']}'")
+            module = Module(title=spec['title'], slug=spec['slug'], order=spec['order'])
+            db.session.add(module)
+            counts['created'] += 1
+        else:
+            _apply(module, title=spec['title'], order=spec['order'])
+        module_rows.append((module, spec))
+    db.session.flush()
+
+    # --- Submodules, one flush per nesting level ---
+    kept_submodule_ids = set()
+    level = [(module.id, None, sub_spec) for module, spec in module_rows for sub_spec in spec['submodules']]
+    note_specs = []
+    while level:
+        level_rows = []
+        for module_id, parent_id, spec in level:
+            submodule = existing_submodules.get((module_id, parent_id, spec['slug']))
+            if submodule is None:
+                click.echo(f"  + Creating Submodule: '{spec['title']}' from '{spec['slug']}'")
+                submodule = Submodule(title=spec['title'], slug=spec['slug'], order=spec['order'],
+                                      module_id=module_id, parent_id=parent_id)
+                db.session.add(submodule)
+                counts['created'] += 1
+            else:
+                _apply(submodule, title=spec['title'], order=spec['order'])
+            level_rows.append((submodule, spec))
+        db.session.flush()
+
+        level = []
+        for submodule, spec in level_rows:
+            kept_submodule_ids.add(submodule.id)
+            note_specs.extend((submodule.id, note_spec) for note_spec in spec['notes'])
+            level.extend((submodule.module_id, submodule.id, child_spec) for child_spec in spec['children'])
+
+    # --- Notes ---
+    kept_note_ids = set()
+    for submodule_id, spec in note_specs:
+        item = existing_notes.get((submodule_id, spec['content_path']))
+        if item is None:
+            click.echo(f"    + Creating Note ModuleItem: '{spec['content_path']}'")
+            db.session.add(ModuleItem(order=spec['order'], submodule_id=submodule_id,
+                                      content_type='note', content_id=None, content_path=spec['content_path']))
+            counts['created'] += 1
+        else:
+            kept_note_ids.add(item.id)
+            _apply(item, order=spec['order'])
+
+    # --- Deletions (bulk, children before parents) ---
+    # Rows under removed modules were already deleted through the ORM cascade.
+    removed_module_ids = {module.id for module in removed_modules}
+    cascaded_submodule_ids = {submodule.id for submodule in existing_submodules.values()
+                              if submodule.module_id in removed_module_ids}
+    removed_submodule_ids = {
+        submodule.id for submodule in existing_submodules.values()
+        if submodule.id not in kept_submodule_ids and submodule.id not in cascaded_submodule_ids
+    }
+    removed_item_ids = [
+        item.id for item in existing_notes.values()
+        if item.id not in kept_note_ids
+        and item.submodule_id not in removed_submodule_ids
+        and item.submodule_id not in cascaded_submodule_ids
+    ]
+    if removed_submodule_ids:
+        removed_item_ids.extend(
+            item_id for item_id, in db.session.query(ModuleItem.id)
+            .filter(ModuleItem.submodule_id.in_(removed_submodule_ids)).all()
+        )
+    if removed_item_ids:
+        UserProgress.query.filter(UserProgress.module_item_id.in_(removed_item_ids)).delete(synchronize_session=False)
+        ModuleItem.query.filter(ModuleItem.id.in_(removed_item_ids)).delete(synchronize_session=False)
+        counts['deleted'] += len(removed_item_ids)
+    if removed_submodule_ids:
+        Submodule.query.filter(Submodule.id.in_(removed_submodule_ids)).delete(synchronize_session=False)
+        counts['deleted'] += len(removed_submodule_ids)
+
+    return counts
+
+ContentPlacement = namedtuple('ContentPlacement', ['id', 'submodule_id', 'module_id'])
+
+class ContentPlacementCache:
+    """
+    In-process cache of every place a quiz, lab or session is linked into the
+    course: (content_type, content_id) -> [ContentPlacement, ...]. Misses are
+    filled with one probe on the composite ix_module_item_content index.
+    Entries expire after CONTENT_PLACEMENT_TTL seconds so that structural edits
+    made through another worker become visible; edits made in this process
+    invalidate the cache immediately (see curriculum_structure_changed).
+    """
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def get(self, content_type, content_id, fresh=False):
+        key = (content_type, int(content_id))
+        now = time.monotonic()
+        if not fresh:
+            with self._lock:
+                entry = self._entries.get(key)
+            if entry and now - entry[0] < self.ttl:
+                return entry[1]
+
+        rows = db.session.query(ModuleItem.id, ModuleItem.submodule_id, Submodule.module_id) \
+            .join(Submodule, ModuleItem.submodule_id == Submodule.id) \
+            .filter(ModuleItem.content_type == content_type, ModuleItem.content_id == key[1]) \
+            .order_by(ModuleItem.id.asc()).all()
+        placements = [ContentPlacement(*row) for row in rows]
+        with self._lock:
+            self._entries[key] = (now, placements)
+        return placements
+
+    def invalidate(self):
+        with self._lock:
+            self._entries.clear()
+
+content_placements = ContentPlacementCache(ttl=app.config['CONTENT_PLACEMENT_TTL'])
+
+def curriculum_structure_changed():
+    """
+    Refreshes the data derived from the course structure after a structural
+    edit: rebuilds the slug path index and drops cached content placements.
+    The caller is responsible for committing.
+    """
+    rebuild_curriculum_paths()
+    content_placements.invalidate()
+
+QuizAnswerKey = namedtuple('QuizAnswerKey', ['quiz_id', 'version', 'passing_score', 'correct_options', 'option_questions'])
+
+def quiz_content_version(parsed_data, passing_score):
+    """Returns a stable hash of parsed quiz content, as produced by parse_quiz_markdown."""
+    payload = json.dumps({'passing_score': passing_score, 'questions': parsed_data}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+def build_quiz_answer_key(quiz_id, version, passing_score, question_ids=None):
+    """
+    Compiles the answer key of a quiz: question_id -> correct option_id and
+    option_id -> question_id, both read-only. If question_ids is given, only
+    those questions (e.g. the sample drawn for one attempt) are included.
+    """
+    query = db.session.query(Question.id, Option.id, Option.is_correct) \
+        .join(Option, Option.question_id == Question.id) \
+        .filter(Question.quiz_id == quiz_id)
+    if question_ids is not None:
+        query = query.filter(Question.id.in_(question_ids))
+    rows = query.order_by(Question.id.asc(), Option.id.asc()).all()
+    correct_options = {}
+    option_questions = {}
+    for question_id, option_id, is_correct in rows:
+        option_questions[option_id] = question_id
+        correct_options.setdefault(question_id, None)
+        if is_correct and correct_options[question_id] is None:
+            correct_options[question_id] = option_id
+    return QuizAnswerKey(quiz_id, version, passing_score,
+                         MappingProxyType(correct_options), MappingProxyType(option_questions))
+
+class QuizAnswerKeyCache:
+    """
+    In-process cache of compiled quiz answer keys, so that a full set of answers
+    can be graded without touching the option table. Each lookup costs a single
+    primary-key read of the quiz row; the cached key is reused for as long as
+    Quiz.content_version is unchanged, so an upload or deletion handled by
+    another worker is picked up without any cross-process signalling.
+    Pooled quizzes (Quiz.sample_size set) are never compiled whole: the key only
+    covers the questions drawn for the attempt identified by `seed`, and is empty
+    without one.
+    """
+    def __init__(self):
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def get(self, quiz_id, seed=None):
+        quiz_id = int(quiz_id)
+        quiz_row = db.session.query(Quiz.passing_score, Quiz.content_version, Quiz.sample_size) \
+            .filter_by(id=quiz_id).first()
+        if quiz_row is None:
+            self.invalidate(quiz_id)
             return None
-    return questions
+
+        passing_score, version, sample_size = quiz_row
+        if sample_size:
+            question_ids = question_pools.sample(quiz_id, version, sample_size, seed) if seed is not None else []
+            return build_quiz_answer_key(quiz_id, version, passing_score, question_ids)
+
+        with self._lock:
+            answer_key = self._keys.get(quiz_id)
+        if answer_key is None or answer_key.version != version or answer_key.passing_score != passing_score:
+            answer_key = build_quiz_answer_key(quiz_id, version, passing_score)
+            with self._lock:
+                self._keys[quiz_id] = answer_key
+        return answer_key
+
+    def invalidate(self, quiz_id=None):
+        with self._lock:
+            if quiz_id is None:
+                self._keys.clear()
+            else:
+                self._keys.pop(int(quiz_id), None)
+
+quiz_answer_keys = QuizAnswerKeyCache()
+
+class QuestionPoolCache:
+    """
+    In-process cache of the question ids of pooled quizzes, stored as compact
+    integer arrays keyed by (quiz_id, content_version) and loaded with one
+    covering-index scan of question.quiz_id. Drawing a sample never touches the
+    question text or options of the questions that were not drawn.
+    """
+    def __init__(self):
+        self._pools = {}
+        self._lock = threading.Lock()
+
+    def question_ids(self, quiz_id, version):
+        key = (quiz_id, version)
+        with self._lock:
+            pool = self._pools.get(key)
+        if pool is None:
+            pool = array('q', (question_id for question_id, in db.session.query(Question.id)
+                               .filter(Question.quiz_id == quiz_id).order_by(Question.id.asc())))
+            with self._lock:
+                for stale_key in [k for k in self._pools if k[0] == quiz_id]:
+                    del self._pools[stale_key]
+                self._pools[key] = pool
+        return pool
+
+    def sample(self, quiz_id, version, sample_size, seed):
+        """Returns the question ids drawn for `seed`, in presentation order. The same seed always draws the same sample."""
+        pool = self.question_ids(quiz_id, version)
+        positions = random.Random(seed).sample(range(len(pool)), min(sample_size, len(pool)))
+        return [pool[position] for position in positions]
+
+    def invalidate(self, quiz_id):
+        with self._lock:
+            for key in [k for k in self._pools if k[0] == quiz_id]:
+                del self._pools[key]
+
+question_pools = QuestionPoolCache()
+
+LabStepMeta = namedtuple('LabStepMeta', ['lab_id', 'step_number', 'matcher', 'step_count'])
+
+class LabStepCache:
+    """
+    In-process LRU cache of compiled lab steps (step_id -> LabStepMeta). A miss
+    loads the step's whole lab in one query and compiles its matchers once.
+    Entries expire after LAB_CACHE_TTL seconds; local deletions invalidate at once.
+    """
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._labs = OrderedDict() # lab_id -> (loaded_at, {step_number: LabStepMeta}, [step_id, ...])
+        self._steps = {} # step_id -> LabStepMeta
+        self._lock = threading.Lock()
+
+    def _load(self, lab_id=None, step_id=None):
+        query = db.session.query(LabStep.id, LabStep.lab_id, LabStep.step_number, LabStep.match_mode, LabStep.match_text)
+        if lab_id is None:
+            lab_id = db.session.query(LabStep.lab_id).filter_by(id=step_id).scalar_subquery()
+        rows = query.filter(LabStep.lab_id == lab_id).all()
+        if not rows:
+            return None
+        step_ids = {}
+        for step_row in rows:
+            matcher = compile_lab_matcher(step_row.match_mode, step_row.match_text)
+            step_ids[step_row.id] = LabStepMeta(step_row.lab_id, step_row.step_number, matcher, len(rows))
+        lab_id = rows[0].lab_id
+        with self._lock:
+            self._forget(lab_id)
+            self._labs[lab_id] = (time.monotonic(), {meta.step_number: meta for meta in step_ids.values()}, list(step_ids))
+            self._steps.update(step_ids)
+            while len(self._labs) > self.max_entries:
+                self._forget(next(iter(self._labs)))
+        return lab_id
+
+    def _forget(self, lab_id):
+        entry = self._labs.pop(lab_id, None)
+        if entry is not None:
+            for step_id in entry[2]:
+                self._steps.pop(step_id, None)
+
+    def _fresh(self, lab_id):
+        entry = self._labs.get(lab_id)
+        if entry is None or time.monotonic() - entry[0] >= self.ttl:
+            return None
+        self._labs.move_to_end(lab_id)
+        return entry
+
+    def step(self, step_id):
+        """Returns the LabStepMeta of a step, or None if it does not exist."""
+        step_id = int(step_id)
+        with self._lock:
+            meta = self._steps.get(step_id)
+            if meta is not None and self._fresh(meta.lab_id) is not None:
+                return meta
+        self._load(step_id=step_id)
+        with self._lock:
+            return self._steps.get(step_id)
+
+    def step_count(self, lab_id):
+        """Returns the number of steps of a lab (0 if it has none)."""
+        lab_id = int(lab_id)
+        with self._lock:
+            entry = self._fresh(lab_id)
+        if entry is None and self._load(lab_id=lab_id) is None:
+            return 0
+        with self._lock:
+            entry = self._labs.get(lab_id)
+            return len(entry[1]) if entry else 0
+
+    def invalidate(self, lab_id=None):
+        with self._lock:
+            if lab_id is None:
+                self._labs.clear()
+                self._steps.clear()
+            else:
+                self._forget(int(lab_id))
+
+lab_steps = LabStepCache(max_entries=app.config['LAB_CACHE_SIZE'], ttl=app.config['LAB_CACHE_TTL'])
+
+def advance_lab_progress(user_id, lab_id, step_number):
+    """
+    Moves a learner past `step_number` with a single compare-and-set UPDATE of
+    their progress row; answering a step they are not currently on (or without
+    having started the lab) changes nothing. The caller is responsible for committing.
+    """
+    LabProgress.query.filter(
+        LabProgress.user_id == user_id,
+        LabProgress.lab_id == lab_id,
+        LabProgress.current_step_number == step_number
+    ).update({LabProgress.current_step_number: step_number + 1}, synchronize_session=False)
+
+def get_quiz_attempt_seed(quiz_id, create=False):
+    """
+    Returns the sample seed of the learner's open attempt at a quiz, kept in the
+    session so reloading the quiz shows the same questions. With create=True a
+    new seed is drawn if there is no open attempt.
+    """
+    seeds = session.get('quiz_seeds', {})
+    seed = seeds.get(str(quiz_id))
+    if seed is None and create:
+        seed = random.SystemRandom().getrandbits(62)
+        session['quiz_seeds'] = {**seeds, str(quiz_id): seed}
+    return seed
+
+def close_quiz_attempt(quiz_id):
+    """Forgets the seed of the open attempt so the next visit draws a new sample."""
+    seeds = session.get('quiz_seeds', {})
+    if str(quiz_id) in seeds:
+        session['quiz_seeds'] = {key: value for key, value in seeds.items() if key != str(quiz_id)}
+
+def warm_quiz_caches(quiz):
+    """Compiles the answer key and page payload of a freshly created quiz; pooled quizzes are sampled per attempt instead."""
+    if quiz.sample_size:
+        question_pools.question_ids(quiz.id, quiz.content_version)
+    else:
+        quiz_answer_keys.get(quiz.id)
+        quiz_payloads.get(quiz)
+
+class MemoryAttemptCounter:
+    """
+    Sliding-window attempt log kept in this process: for every key, the
+    timestamps of at most `limit` recent attempts. Checking and recording an
+    attempt is O(limit), independent of the attempt history.
+    """
+    def __init__(self):
+        self._stamps = {}
+        self._lock = threading.Lock()
+
+    def _recent(self, key, limit, window, now):
+        stamps = self._stamps.get(key)
+        if stamps is None or stamps.maxlen != limit:
+            stamps = self._stamps[key] = deque(stamps or (), maxlen=limit)
+        while stamps and stamps[0] <= now - window:
+            stamps.popleft()
+        return stamps
+
+    def acquire(self, key, limit, window, now=None):
+        """Records an attempt if the key is under its limit. Returns (allowed, retry_after_seconds)."""
+        now = time.time() if now is None else now
+        with self._lock:
+            if len(self._stamps) > 10000:
+                self._stamps = {k: v for k, v in self._stamps.items() if v and v[-1] > now - window}
+            stamps = self._recent(key, limit, window, now)
+            if len(stamps) >= limit:
+                return False, stamps[0] + window - now
+            stamps.append(now)
+            return True, 0
+
+class SQLiteAttemptCounter:
+    """
+    Sliding-window attempt log in a small SQLite file next to the app, shared by
+    every worker process on the host. Each check is one primary-key read and at
+    most one upsert inside a BEGIN IMMEDIATE transaction.
+    """
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._writes = 0
+
+    def _connect(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("CREATE TABLE IF NOT EXISTS attempt_window "
+                         "(key TEXT PRIMARY KEY, stamps TEXT NOT NULL, expires_at REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def _recent(self, conn, key, window, now):
+        row = conn.execute("SELECT stamps FROM attempt_window WHERE key = ?", (key,)).fetchone()
+        return [stamp for stamp in json.loads(row[0]) if stamp > now - window] if row else []
+
+    def acquire(self, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            stamps = self._recent(conn, key, window, now)
+            if len(stamps) >= limit:
+                conn.execute("COMMIT")
+                return False, stamps[-limit] + window - now
+            stamps = (stamps + [now])[-limit:]
+            conn.execute(
+                "INSERT INTO attempt_window (key, stamps, expires_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(key) DO UPDATE SET stamps = excluded.stamps, expires_at = excluded.expires_at",
+                (key, json.dumps(stamps), now + window)
+            )
+            self._writes += 1
+            if self._writes % 1000 == 0:
+                conn.execute("DELETE FROM attempt_window WHERE expires_at < ?", (now,))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return True, 0
+
+class RedisAttemptCounter:
+    """
+    Sliding-window attempt log in a sorted set per key on a Redis-compatible
+    server (Redis, Valkey, KeyDB, ...). Pruning, counting and recording run in
+    one server-side script, so concurrent workers cannot overshoot the limit.
+    Requires the optional 'redis' package.
+    """
+    ACQUIRE_SCRIPT = """
+        redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', tonumber(ARGV[1]) - tonumber(ARGV[2]))
+        if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[3]) then
+            local oldest = redis.call('ZRANGE', KEYS[1], 0, 0, 'WITHSCORES')
+            return {0, oldest[2]}
+        end
+        redis.call('ZADD', KEYS[1], ARGV[1], ARGV[4])
+        redis.call('EXPIRE', KEYS[1], ARGV[5])
+        return {1, '0'}
+    """
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("QUIZ_ATTEMPT_BACKEND = 'redis' requires the 'redis' package (pip install redis).")
+        self.client = redis.Redis.from_url(url)
+        self._acquire = self.client.register_script(self.ACQUIRE_SCRIPT)
+
+    def acquire(self, key, limit, window, now=None):
+        now = time.time() if now is None else now
+        member = f"{now}:{os.getpid()}:{random.getrandbits(32)}"
+        allowed, oldest = self._acquire(keys=[f"quiz_attempts:{key}"],
+                                        args=[now, window, limit, member, math.ceil(window)])
+        return (True, 0) if allowed else (False, float(oldest) + window - now)
+
+def make_attempt_counter(backend, url=None):
+    """Creates the attempt counter backend named by QUIZ_ATTEMPT_BACKEND."""
+    if backend == 'memory':
+        return MemoryAttemptCounter()
+    if backend == 'sqlite':
+        return SQLiteAttemptCounter(url or os.path.join(app.instance_path, 'quiz_attempts.db'))
+    if backend == 'redis':
+        return RedisAttemptCounter(url or 'redis://localhost:6379/0')
+    raise ValueError(f"Unknown QUIZ_ATTEMPT_BACKEND '{backend}'")
+
+quiz_attempt_counter = make_attempt_counter(app.config['QUIZ_ATTEMPT_BACKEND'], app.config['QUIZ_ATTEMPT_BACKEND_URL'])
+
+def acquire_quiz_attempt(user_id, quiz_id, kind='submit'):
+    """
+    Registers a quiz submission (or, with kind='check', an answer check) for the
+    lockout window. Submissions and checks have separate limits and counters.
+    Returns 0 if the call may proceed, otherwise the whole number of seconds
+    until the next one is allowed.
+    """
+    if kind == 'check':
+        limit, key = app.config['QUIZ_CHECK_LIMIT'], f"check:{user_id}:{quiz_id}"
+    else:
+        limit, key = app.config['QUIZ_ATTEMPT_LIMIT'], f"{user_id}:{quiz_id}"
+    if not limit:
+        return 0
+    allowed, retry_after = quiz_attempt_counter.acquire(key, limit, app.config['QUIZ_ATTEMPT_WINDOW'])
+    return 0 if allowed else max(1, math.ceil(retry_after))
+
+def quiz_lockout_response(retry_after):
+    response = jsonify({
+        'error': f"Too many attempts. Please try again in {retry_after} seconds.",
+        'retry_after': retry_after
+    })
+    response.headers['Retry-After'] = str(retry_after)
+    return response, 429
+
+def grade_quiz_answers(answer_key, answers):
+    """
+    Grades a {question_id: option_id} mapping against a compiled answer key.
+    Returns (results, score), where results maps each answered question_id to
+    {'correct': bool, 'correct_option_id': int}. Raises ValueError if an answer
+    refers to a question outside the quiz or an option of another question.
+    """
+    results = {}
+    score = 0
+    for question_id, option_id in answers.items():
+        question_id, option_id = int(question_id), int(option_id)
+        if question_id not in answer_key.correct_options or answer_key.option_questions.get(option_id) != question_id:
+            raise ValueError(f"Invalid answer for question {question_id}")
+        correct_option_id = answer_key.correct_options[question_id]
+        is_correct = option_id == correct_option_id
+        score += is_correct
+        results[question_id] = {'correct': is_correct, 'correct_option_id': correct_option_id}
+    return results, score
+
+def build_quiz_payload(quiz_id, version, question_ids=None):
+    """
+    Builds the render-ready payload of a quiz with a single query: the questions
+    and options shown on the page, plus the review data pre-serialized to JSON.
+    If question_ids is given, only those questions are included, in that order.
+    The payload is sent with the page, so it never says which options are correct;
+    the review highlights them from the results returned by submit_result.
+    """
+    query = db.session.query(Question.id, Question.question_text, Option.id, Option.option_text) \
+        .outerjoin(Option, Option.question_id == Question.id) \
+        .filter(Question.quiz_id == quiz_id)
+    if question_ids is not None:
+        query = query.filter(Question.id.in_(question_ids))
+    rows = query.order_by(Question.id.asc(), Option.id.asc()).all()
+    if question_ids is not None:
+        position = {question_id: i for i, question_id in enumerate(question_ids)}
+        rows.sort(key=lambda row: position[row[0]])
+    questions = []
+    for question_id, question_text, option_id, option_text in rows:
+        if not questions or questions[-1]['id'] != question_id:
+            questions.append({'id': question_id, 'text': question_text, 'options': []})
+        if option_id is not None:
+            questions[-1]['options'].append({'id': option_id, 'text': option_text})
+    return {
+        'quiz_id': quiz_id,
+        'version': version,
+        'questions': questions,
+        'question_count': len(questions),
+        'review_json': json.dumps(questions)
+    }
+
+class QuizPayloadCache:
+    """
+    Bounded LRU cache of quiz page payloads keyed by (quiz_id, content_version),
+    with an optional on-disk tier shared by all workers. A new upload gets a new
+    content_version, so stale entries are never served; they simply age out.
+    Quizzes without a content_version are built on every request.
+    """
+    def __init__(self, max_entries=256, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _disk_path(self, quiz_id, version):
+        # 'v2' payloads carry no answer flags; files written in the older format are never read
+        return os.path.join(self.cache_dir, f"quiz-{quiz_id}-{version}.v2.json")
+
+    def _remember(self, key, payload):
+        with self._lock:
+            self._entries[key] = payload
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def get(self, quiz):
+        """Returns the payload for a Quiz row, building and storing it on a miss."""
+        if not quiz.content_version:
+            return build_quiz_payload(quiz.id, None)
+
+        key = (quiz.id, quiz.content_version)
+        with self._lock:
+            payload = self._entries.get(key)
+            if payload is not None:
+                self._entries.move_to_end(key)
+                return payload
+
+        if self.cache_dir:
+            try:
+                with open(self._disk_path(*key), 'r', encoding='utf-8') as f:
+                    payload = json.load(f)
+            except (OSError, ValueError):
+                payload = None
+            if payload is not None:
+                self._remember(key, payload)
+                return payload
+
+        payload = build_quiz_payload(*key)
+        self._remember(key, payload)
+
+        if self.cache_dir:
+            try:
+                os.makedirs(self.cache_dir, exist_ok=True)
+                disk_path = self._disk_path(*key)
+                tmp_path = f"{disk_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(payload, f)
+                os.replace(tmp_path, disk_path)
+            except OSError as e:
+                print(f"Warning: could not write quiz cache file: {e}")
+        return payload
+
+    def invalidate(self, quiz_id):
+        """Drops every cached version of a quiz, in memory and on disk."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == quiz_id]:
+                del self._entries[key]
+        if self.cache_dir and os.path.isdir(self.cache_dir):
+            prefix = f"quiz-{quiz_id}-"
+            for entry in os.scandir(self.cache_dir):
+                if entry.name.startswith(prefix):
+                    try:
+                        os.remove(entry.path)
+                    except OSError:
+                        pass
+
+quiz_payloads = QuizPayloadCache(
+    max_entries=app.config['QUIZ_CACHE_SIZE'],
+    cache_dir=app.config['QUIZ_CACHE_DIR']
+)
+
+QuizParseError = namedtuple('QuizParseError', ['line', 'message'])
+
+QUIZ_QUESTION_RE = re.compile(r'^#\s*Question\b[^:]*:\s*(.*)$', re.IGNORECASE)
+QUIZ_ANSWER_RE = re.compile(r'^Answer\s*:\s*(.*?)\s*$', re.IGNORECASE)
+QUIZ_OPTION_RE = re.compile(r'^(?:option\s*)?([A-Za-z]|\d+)\s*[:.)]\s*(.*)$', re.IGNORECASE)
+QUIZ_ANSWER_VALUE_RE = re.compile(r'^(?:option\s*)?(\d+|[A-Za-z])\.?$', re.IGNORECASE)
+
+def parse_quiz_lines(lines):
+    """
+    Single-pass parser for quiz markdown. `lines` may be any iterable of text or
+    UTF-8 encoded lines (an open file, an upload stream, ...); only the question
+    being read is held in memory. A question is a '# Question N: text' header,
+    two or more option lines ('option 1: text', 'A: text', 'B) text', ...) and an
+    'Answer: option N' line; a letter such as 'Answer: B' is accepted too.
+    Returns (questions, errors): the parsed question dictionaries and a list of
+    QuizParseError(line, message) covering every problem found in the document.
+    Questions with errors are left out of the result.
+    """
+    questions = []
+    errors = []
+    current = None
+    question_max = Question.question_text.type.length
+    option_max = Option.option_text.type.length
+
+    def fail(line_number, message):
+        errors.append(QuizParseError(line_number, message))
+        if current is not None:
+            current['valid'] = False
+
+    def finish():
+        if current is None:
+            return
+        line_number = current['line']
+        options = current['options']
+        if len(options) < 2:
+            fail(line_number, f"Question has {len(options)} option(s); at least 2 are required")
+        if current['answer'] is None:
+            fail(line_number, "Question has no 'Answer:' line")
+        elif options:
+            answer, answer_line = current['answer']
+            if answer.isdigit():
+                correct_index = int(answer) - 1
+            else:
+                correct_index = current['labels'].index(answer.upper()) if answer.upper() in current['labels'] else -1
+            if not 0 <= correct_index < len(options):
+                fail(answer_line, f"Answer '{answer}' does not match any of the {len(options)} options")
+            current['correct_index'] = correct_index
+        if current['valid']:
+            questions.append({
+                'question_text': current['question_text'],
+                'options': options,
+                'correct_index': current['correct_index']
+            })
+
+    for line_number, raw_line in enumerate(lines, start=1):
+        if isinstance(raw_line, bytes):
+            try:
+                raw_line = raw_line.decode('utf-8')
+            except UnicodeDecodeError:
+                fail(line_number, "Line is not valid UTF-8 text")
+                continue
+        line = raw_line.strip()
+        if not line:
+            continue
+
+        match = QUIZ_QUESTION_RE.match(line)
+        if match:
+            finish()
+            current = {'line': line_number, 'question_text': match.group(1).strip(), 'options': [],
+                       'labels': [], 'answer': None, 'correct_index': None, 'valid': True}
+            if not current['question_text']:
+                fail(line_number, "Question text is empty")
+            elif len(current['question_text']) > question_max:
+                fail(line_number, f"Question text is longer than {question_max} characters")
+            continue
+
+        if current is None:
+            fail(line_number, "Expected a '# Question N: ...' header before this line")
+            continue
+
+        match = QUIZ_ANSWER_RE.match(line)
+        if match:
+            value = QUIZ_ANSWER_VALUE_RE.match(match.group(1))
+            if current['answer'] is not None:
+                fail(line_number, "Question has more than one 'Answer:' line")
+            elif not value:
+                fail(line_number, f"Could not read the answer '{match.group(1)}'; expected e.g. 'Answer: option 2'")
+            else:
+                current['answer'] = (value.group(1), line_number)
+            continue
+
+        match = QUIZ_OPTION_RE.match(line)
+        if match:
+            label, option_text = match.group(1).upper(), match.group(2).strip()
+            if current['answer'] is not None:
+                fail(line_number, "Option appears after the 'Answer:' line")
+            elif label in current['labels']:
+                fail(line_number, f"Duplicate option label '{label}'")
+            elif not option_text:
+                fail(line_number, f"Option {label} is empty")
+            elif len(option_text) > option_max:
+                fail(line_number, f"Option {label} is longer than {option_max} characters")
+            current['labels'].append(label)
+            current['options'].append(option_text)
+            continue
+
+        fail(line_number, f"Unrecognized line: '{line[:60]}'")
+    finish()
+    errors.sort(key=lambda error: error.line)
+
+    if not questions and not errors:
+        errors.append(QuizParseError(0, "No questions found"))
+    return questions, errors
+
+def format_quiz_parse_errors(errors, limit=10):
+    """Formats parse errors as a single 'Line N: message; ...' string for flash messages."""
+    parts = [f"Line {error.line}: {error.message}" for error in errors[:limit]]
+    if len(errors) > limit:
+        parts.append(f"... and {len(errors) - limit} more")
+    return '; '.join(parts)
+
+def parse_quiz_markdown(markdown_text):
+    """
+    Parses a string of markdown text and returns a list of question dictionaries.
+    Returns None if there is a parsing error (see parse_quiz_lines for details).
+    """
+    questions, errors = parse_quiz_lines(io.StringIO(markdown_text))
+    for error in errors:
+        print(f"Error parsing quiz (line {error.line}): {error.message}")
+    return None if errors else questions
    
+def _normalized_whitespace(text):
+    return ' '.join(text.split())
+
+def _command_signature(text):
+    """
+    Canonical form of a shell command for the 'command' match mode: the command
+    and its positional arguments in order, plus the set of options in any order.
+    Bundled short flags are split, so '-la' and '-a -l' compare equal.
+    """
+    try:
+        tokens = shlex.split(text)
+    except ValueError: # unbalanced quotes
+        tokens = text.split()
+    positional, options = [], []
+    for token in tokens:
+        if token.startswith('--') or not token.startswith('-') or len(token) < 2 or token[1:].isdigit():
+            (options if token.startswith('--') else positional).append(token)
+        else:
+            options.extend(f"-{flag}" for flag in token[1:])
+    return tuple(positional), frozenset(options)
+
+def _exact_matcher(answers):
+    accepted = frozenset(answer.strip() for answer in answers)
+    return lambda user_input: user_input.strip() in accepted
+
+def _normalized_matcher(answers):
+    accepted = frozenset(_normalized_whitespace(answer) for answer in answers)
+    return lambda user_input: _normalized_whitespace(user_input) in accepted
+
+def _command_matcher(answers):
+    accepted = frozenset(_command_signature(answer) for answer in answers)
+    return lambda user_input: _command_signature(user_input) in accepted
+
+def _regex_matcher(answers):
+    patterns = []
+    for answer in answers:
+        try:
+            patterns.append(re.compile(answer))
+        except re.error as e:
+            raise ValueError(f"invalid regular expression '{answer}': {e}")
+    return lambda user_input: any(pattern.fullmatch(user_input.strip()) for pattern in patterns)
+
+# Match modes a lab step can declare with '- mode:'; each builds a matcher from the accepted answers
+LAB_MATCH_MODES = {
+    'exact': _exact_matcher,             # identical after trimming the ends
+    'normalized': _normalized_matcher,   # identical after collapsing runs of whitespace
+    'command': _command_matcher,         # same shell command, options in any order
+    'regex': _regex_matcher,             # the whole input matches one of the patterns
+}
+
+def compile_lab_matcher(match_mode, match_text):
+    """
+    Compiles the accepted answers of a lab step (one per line of match_text) into
+    a callable user_input -> bool for the given match mode. Raises ValueError for
+    an unknown mode or an invalid pattern.
+    """
+    if match_mode not in LAB_MATCH_MODES:
+        raise ValueError(f"unknown match mode '{match_mode}'")
+    return LAB_MATCH_MODES[match_mode](match_text.split('\n'))
+
 def parse_lab_markdown(markdown_text):
     """
     Parses a string of lab markdown text with strict validation.
+    A step may list several accepted answers (one '- match:' line each) and pick
+    how they are compared with an optional '- mode:' line (see LAB_MATCH_MODES);
+    the 'Type:' example shown to the learner must itself be accepted.
     Returns a tuple: (list_of_steps, error_message).
     On success, error_message is None.
     On failure, list_of_steps is None.
@@ -131,29 +1689,35 @@ def parse_lab_markdown(markdown_text):
             step_number = int(step_number_str.strip())
             description_text = description_text.strip()
 
-            # Find Type and match lines
+            # Find Type, match and mode lines
             type_line = next((line for line in other_lines if line.strip().startswith('Type:')), None)
-            match_line = next((line for line in other_lines if line.strip().startswith('- match:')), None)
+            match_lines = [line for line in other_lines if line.strip().startswith('- match:')]
+            mode_line = next((line for line in other_lines if line.strip().startswith('- mode:')), None)
 
             # --- STRICT VALIDATION ---
             if type_line is None:
                 return None, f"Validation Error in Step {step_number}: 'Type:' tag is missing."
-            if match_line is None:
+            if not match_lines:
                 return None, f"Validation Error in Step {step_number}: '- match:' tag is missing."
             
             # Extract and strip whitespace from both ends
             type_text = type_line.split(':', 1)[1].strip()
-            match_text = match_line.split(':', 1)[1].strip()
+            answers = [line.split(':', 1)[1].strip() for line in match_lines]
+            match_mode = mode_line.split(':', 1)[1].strip().lower() if mode_line else 'exact'
 
             # Check if fields are empty AFTER stripping
             if not type_text:
                 return None, f"Validation Error in Step {step_number}: 'Type:' cannot be empty or just whitespace."
-            if not match_text:
+            if not all(answers):
                  return None, f"Validation Error in Step {step_number}: '- match:' cannot be empty or just whitespace."
 
-            # Compare the cleaned-up values
-            if type_text != match_text:
-                return None, f"Validation Error in Step {step_number}: 'Type:' and '- match:' values do not match. Got '{type_text}' and '{match_text}'."
+            # The example shown to the learner must be an accepted answer
+            try:
+                matcher = compile_lab_matcher(match_mode, '\n'.join(answers))
+            except ValueError as e:
+                return None, f"Validation Error in Step {step_number}: {e}."
+            if not matcher(type_text):
+                return None, f"Validation Error in Step {step_number}: 'Type:' value '{type_text}' is not accepted by its '- match:' answers ({match_mode} mode)."
             
             # --- END OF VALIDATION ---
 
@@ -161,7 +1725,8 @@ def parse_lab_markdown(markdown_text):
                 'step_number': step_number,
                 'description_text': description_text,
                 'type_text': type_text,
-                'match_text': match_text
+                'match_text': '\n'.join(answers),
+                'match_mode': match_mode
             }
             steps.append(step_data)
 
@@ -210,6 +1775,206 @@ def parse_session_yaml(yaml_text):
 
     return {'title': title, 'requirements': requirements}, None # Success
 
+def quiz_category_for(question_count, category=None):
+    """
+    Returns the QUIZ_CATEGORIES key for a quiz with `question_count` questions:
+    `category` if the file holds at least that category's question count (a
+    larger file becomes a pool that is sampled per attempt), otherwise the first
+    category with exactly that count when no category was requested, else None.
+    """
+    if category:
+        return category if question_count >= QUIZ_CATEGORIES[category]['questions'] else None
+    return next((key for key, data in QUIZ_CATEGORIES.items() if data['questions'] == question_count), None)
+
+def create_quiz(filename, parsed_data, category):
+    """
+    Creates a quiz from parse_quiz_lines output with one bulk INSERT for the
+    questions and one for the options. `category` is a key of QUIZ_CATEGORIES.
+    The caller is responsible for committing.
+    """
+    category_data = QUIZ_CATEGORIES[category]
+    quiz = Quiz(
+        title=os.path.splitext(filename)[0].replace('_', ' ').title(),
+        filename=filename,
+        category=category_data['name'],
+        passing_score=category_data['passing_score'],
+        content_version=quiz_content_version(parsed_data, category_data['passing_score']),
+        sample_size=category_data['questions'] if len(parsed_data) > category_data['questions'] else None
+    )
+    db.session.add(quiz)
+    db.session.flush()
+
+    db.session.execute(insert(Question), [
+        {'question_text': q_data['question_text'], 'quiz_id': quiz.id} for q_data in parsed_data
+    ])
+    # Id order is insertion order for the single statement above
+    question_ids = [question_id for question_id, in db.session.query(Question.id)
+                    .filter(Question.quiz_id == quiz.id).order_by(Question.id.asc()).all()]
+    db.session.execute(insert(Option), [
+        {'option_text': opt_text, 'is_correct': i == q_data['correct_index'], 'question_id': question_id}
+        for question_id, q_data in zip(question_ids, parsed_data)
+        for i, opt_text in enumerate(q_data['options'])
+    ])
+    return quiz
+
+def create_lab(filename, parsed_steps):
+    """Creates a lab and all of its steps with one bulk INSERT. The caller is responsible for committing."""
+    lab = Lab(title=os.path.splitext(filename)[0].replace('_', ' ').title(), filename=filename)
+    db.session.add(lab)
+    db.session.flush()
+    db.session.execute(insert(LabStep), [
+        {'step_number': step['step_number'], 'description_text': step['description_text'],
+         'type_text': step['type_text'], 'match_text': step['match_text'],
+         'match_mode': step.get('match_mode', 'exact'), 'lab_id': lab.id}
+        for step in parsed_steps
+    ])
+    return lab
+
+def create_practical_session(filename, parsed_session):
+    """Creates a practical session and its requirements with one bulk INSERT. The caller is responsible for committing."""
+    session = PracticalSession(title=parsed_session['title'], filename=filename)
+    db.session.add(session)
+    db.session.flush()
+    db.session.execute(insert(Requirement), [
+        {'description': req['description'], 'check_type': req['check_type'], 'selector': req.get('selector'),
+         'attribute_name': req.get('attribute_name'), 'value': req.get('value'), 'session_id': session.id}
+        for req in parsed_session['requirements']
+    ])
+    return session
+
+def parse_content_file(name, data):
+    """
+    Parses one quiz, lab or session file given as raw bytes. Runs in a worker
+    process during bulk imports, so it only returns plain data:
+    {'name', 'kind', 'data', 'errors'}. .yaml/.yml files are sessions; markdown
+    files are told apart by their first non-blank line.
+    """
+    result = {'name': name, 'kind': None, 'data': None, 'errors': []}
+    extension = os.path.splitext(name)[1].lower()
+
+    if extension in ('.yaml', '.yml'):
+        result['kind'] = 'session'
+        result['data'], error_message = parse_session_yaml(data)
+        if error_message:
+            result['errors'].append(error_message)
+        return result
+
+    try:
+        text = data.decode('utf-8')
+    except UnicodeDecodeError:
+        result['errors'].append("File is not valid UTF-8 text")
+        return result
+
+    first_line = next((line.strip() for line in io.StringIO(text) if line.strip()), '')
+    if QUIZ_QUESTION_RE.match(first_line):
+        result['kind'] = 'quiz'
+        result['data'], parse_errors = parse_quiz_lines(io.StringIO(text))
+        result['errors'].extend(f"Line {error.line}: {error.message}" for error in parse_errors)
+    elif first_line.startswith('Step '):
+        result['kind'] = 'lab'
+        result['data'], error_message = parse_lab_markdown(text)
+        if error_message:
+            result['errors'].append(error_message)
+    else:
+        result['errors'].append("Not a quiz ('# Question 1: ...') or lab ('Step 1: ...') file")
+    return result
+
+def read_content_files(source):
+    """
+    Returns [(name, bytes), ...] for every .md, .yaml and .yml file in a zip
+    archive (a path or a file object) or a directory tree, skipping hidden files.
+    Oversized files are returned as None so they can be reported.
+    """
+    max_size = app.config['CONTENT_IMPORT_MAX_FILE_SIZE']
+    extensions = ('.md', '.yaml', '.yml')
+    files = []
+
+    if isinstance(source, str) and os.path.isdir(source):
+        for dirpath, dirnames, filenames in os.walk(source):
+            dirnames[:] = sorted(d for d in dirnames if not d.startswith('.'))
+            for filename in sorted(filenames):
+                if filename.startswith('.') or not filename.lower().endswith(extensions):
+                    continue
+                full_path = os.path.join(dirpath, filename)
+                if os.path.getsize(full_path) > max_size:
+                    files.append((filename, None))
+                    continue
+                with open(full_path, 'rb') as f:
+                    files.append((filename, f.read()))
+        return files
+
+    with zipfile.ZipFile(source) as archive:
+        for member in archive.infolist():
+            filename = os.path.basename(member.filename)
+            if member.is_dir() or '__MACOSX' in member.filename or filename.startswith('.') \
+                    or not filename.lower().endswith(extensions):
+                continue
+            files.append((filename, archive.read(member) if member.file_size <= max_size else None))
+    return files
+
+def import_content_files(files, quiz_category=None, max_workers=None):
+    """
+    Bulk-imports quiz, lab and session files: parses them in a process pool,
+    then writes each file with bulk INSERTs in its own transaction, so one bad
+    file does not block the others. Quizzes use `quiz_category` if given,
+    otherwise the category whose question count matches the file.
+    Returns a list of {'name', 'kind', 'status', 'message'} reports, one per file.
+    """
+    max_workers = max_workers or app.config['CONTENT_IMPORT_WORKERS']
+    readable = [(name, data) for name, data in files if data is not None]
+    reports = [{'name': name, 'kind': None, 'status': 'error', 'message': 'File is too large'}
+               for name, data in files if data is None]
+
+    if max_workers > 1 and len(readable) > 1:
+        try:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                results = list(executor.map(parse_content_file, *zip(*readable),
+                                            chunksize=max(1, len(readable) // (max_workers * 4))))
+        except (OSError, BrokenProcessPool):
+            results = [parse_content_file(name, data) for name, data in readable]
+    else:
+        results = [parse_content_file(name, data) for name, data in readable]
+
+    models_by_kind = {'quiz': Quiz, 'lab': Lab, 'session': PracticalSession}
+    for result in results:
+        report = {'name': result['name'], 'kind': result['kind'], 'status': 'error', 'message': ''}
+        reports.append(report)
+        if result['errors']:
+            report['message'] = '; '.join(result['errors'][:10])
+            continue
+
+        model = models_by_kind[result['kind']]
+        if db.session.query(model.id).filter_by(filename=result['name']).first():
+            report['message'] = f"A {result['kind']} with the filename '{result['name']}' already exists"
+            continue
+
+        try:
+            if result['kind'] == 'quiz':
+                category = quiz_category_for(len(result['data']), quiz_category)
+                if category is None:
+                    report['message'] = f"{len(result['data'])} questions do not match " + \
+                        (f"the '{quiz_category}' category" if quiz_category else "any quiz category; pass a category to import a pool")
+                    continue
+                entity = create_quiz(result['name'], result['data'], category)
+                count = f"{len(result['data'])} questions"
+            elif result['kind'] == 'lab':
+                entity = create_lab(result['name'], result['data'])
+                count = f"{len(result['data'])} steps"
+            else:
+                entity = create_practical_session(result['name'], result['data'])
+                count = f"{len(result['data']['requirements'])} requirements"
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            report['message'] = f"Database error: {e}"
+            continue
+
+        if result['kind'] == 'quiz':
+            warm_quiz_caches(entity)
+        report['status'] = 'success'
+        report['message'] = f"Created '{entity.title}' ({count})"
+    return reports
+
 def save_picture(form_picture):
     random_hex = os.urandom(8).hex()
     _, f_ext = os.path.splitext(form_picture.filename)
@@ -221,198 +1986,990 @@ def save_picture(form_picture):
 
     return picture_fn
 
+def complete_module_item(user_id, placement):
+    """
+    Marks a module item (a ContentPlacement) as completed for a user and bumps
+    the parent module's ModuleProgress counter if the completion is new.
+    Returns the parent module id if it was, otherwise None.
+    """
+    # Conditional UPDATE plus a savepoint insert, so concurrent submissions count the item once
+    newly_completed = UserProgress.query.filter(
+        UserProgress.user_id == user_id,
+        UserProgress.module_item_id == placement.id,
+        UserProgress.status != 'completed'
+    ).update({UserProgress.status: 'completed'}, synchronize_session=False) == 1
+
+    if not newly_completed and not db.session.query(
+        UserProgress.query.filter_by(user_id=user_id, module_item_id=placement.id).exists()
+    ).scalar():
+        try:
+            with db.session.begin_nested():
+                db.session.add(UserProgress(user_id=user_id, module_item_id=placement.id, status='completed'))
+            newly_completed = True
+        except IntegrityError:
+            # A concurrent request recorded this completion first
+            newly_completed = False
+
+    if not newly_completed:
+        return None
+
+    module_id = placement.module_id
+    if module_id is None:
+        return None
+
+    def _increment():
+        return ModuleProgress.query.filter_by(user_id=user_id, module_id=module_id).update(
+            {ModuleProgress.completed_items: ModuleProgress.completed_items + 1}, synchronize_session=False
+        )
+
+    if not _increment():
+        try:
+            with db.session.begin_nested():
+                db.session.add(ModuleProgress(user_id=user_id, module_id=module_id, completed_items=1))
+        except IntegrityError:
+            _increment()
+    return module_id
+
 def update_user_progress_and_unlock(user, content_type, content_id):
     """
-    Finds a module item, marks it as complete for the user, and checks
-    if the parent module can be unlocked.
+    Finds every module item that links this content, marks each one as
+    complete for the user, and checks if the parent modules can be unlocked.
+    Everything happens in a single transaction; the completion check reads the
+    materialized ModuleProgress counter and the unlock is a compare-and-set on
+    current_module_order, so concurrent submissions can never advance the user
+    twice.
     """
-    # Find the module item in the course structure
-    module_item = ModuleItem.query.filter_by(content_type=content_type, content_id=content_id).first()
+    # Find every placement of this content in the course structure
+    placements = content_placements.get(content_type, content_id, fresh=True)
     
     # If this content isn't in the course, there's nothing to do.
-    if not module_item:
+    if not placements:
         return
 
-    # Find or create a progress record for this user and this item
-    progress_record = UserProgress.query.filter_by(user_id=user.id, module_item_id=module_item.id).first()
-    if not progress_record:
-        progress_record = UserProgress(user_id=user.id, module_item_id=module_item.id)
-        db.session.add(progress_record)
-    
-    # If it's already complete, we don't need to re-process everything.
-    if progress_record.status == 'completed':
-        db.session.commit() # Commit in case a new record was added
-        return
-        
-    progress_record.status = 'completed'
-    db.session.commit()
-
-    # --- MODULE COMPLETION & CERTIFICATE LOGIC ---
-    parent_module = module_item.submodule.module
-    
-    all_item_ids = [
-        item.id for item in ModuleItem.query.join(Submodule)
-        .filter(Submodule.module_id == parent_module.id).all()
-    ]
-    
-    completed_items_count = UserProgress.query.filter(
-        UserProgress.user_id == user.id,
-        UserProgress.module_item_id.in_(all_item_ids),
-        UserProgress.status == 'completed'
-    ).count()
+    try:
+        completed_module_ids = set()
+        for placement in placements:
+            module_id = complete_module_item(user.id, placement)
+            if module_id is not None:
+                completed_module_ids.add(module_id)
+
+        if completed_module_ids:
+            # --- MODULE COMPLETION & UNLOCKING ---
+            # Walk modules in course order so finishing several in one event unlocks them in sequence.
+            module_states = db.session.query(Module.order, Module.item_count, ModuleProgress.completed_items) \
+                .join(ModuleProgress, ModuleProgress.module_id == Module.id) \
+                .filter(Module.id.in_(completed_module_ids), ModuleProgress.user_id == user.id) \
+                .order_by(Module.order.asc()).all()
+            for module_state in module_states:
+                if module_state.item_count > 0 and module_state.completed_items >= module_state.item_count:
+                    # Only unlock the *next* module if the user just completed their *current* one.
+                    User.query.filter(
+                        User.id == user.id,
+                        User.current_module_order == module_state.order
+                    ).update({User.current_module_order: User.current_module_order + 1}, synchronize_session=False)
 
-    # Check if the module is now 100% complete
-    if len(all_item_ids) > 0 and completed_items_count == len(all_item_ids):
-        # --- MODULE UNLOCKING ---
-        # Only unlock the *next* module if the user just completed their *current* one.
-        if user.current_module_order == parent_module.order:
-            user.current_module_order += 1
-            db.session.commit() # Commit module order change
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
     
 # app.py -> In the HELPER FUNCTIONS section
+
+class HtmlParserBackend:
+    """
+    A BeautifulSoup tree builder session submissions can be parsed with.
+    Subclasses set `name` and, for optional builders, the module they `require`.
+    """
+    name = None
+    requires = None
+
+    def __init__(self):
+        self._available = None
+
+    def available(self):
+        if self._available is None:
+            self._available = self.requires is None or importlib.util.find_spec(self.requires) is not None
+        return self._available
+
+    def parse(self, markup):
+        raise NotImplementedError
+
+class PythonHtmlParserBackend(HtmlParserBackend):
+    """Python's built-in html.parser: always available, pure Python."""
+    name = 'html.parser'
+
+    def parse(self, markup):
+        return BeautifulSoup(markup, 'html.parser')
+
+class LxmlHtmlParserBackend(HtmlParserBackend):
+    """
+    lxml's C parser. lxml wraps fragments in <html>/<head>/<body> elements the
+    learner never wrote; those are unwrapped again so that selectors such as
+    'html' or 'body p' give the same answers as with html.parser.
+    """
+    name = 'lxml'
+    requires = 'lxml'
+    IMPLIED_TAGS = {name: re.compile(rf'<{name}[\s/>]', re.IGNORECASE) for name in ('body', 'head', 'html')}
+
+    def parse(self, markup):
+        soup = BeautifulSoup(markup, 'lxml')
+        for name, written in self.IMPLIED_TAGS.items():
+            if not written.search(markup):
+                implied = soup.find(name)
+                if implied is not None:
+                    implied.unwrap()
+        return soup
+
+HTML_PARSER_BACKENDS = {backend.name: backend for backend in (PythonHtmlParserBackend(), LxmlHtmlParserBackend())}
+
+def get_html_parser_backend(name=None):
+    """Returns the parser backend named by `name` or SESSION_HTML_PARSER."""
+    name = name or app.config['SESSION_HTML_PARSER']
+    backend = HTML_PARSER_BACKENDS.get(name)
+    if backend is None:
+        raise ValueError(f"Unknown SESSION_HTML_PARSER '{name}'")
+    if not backend.available():
+        raise RuntimeError(f"SESSION_HTML_PARSER = '{name}' requires the '{backend.requires}' package (pip install {backend.requires}).")
+    return backend
+
+class HtmlDocument:
+    """
+    One parse of a learner's HTML, shared by every check of a validation plan.
+    Selector results are memoized per compiled selector, so requirements that
+    test the same element (exists, attribute, text, ...) match it only once.
+    CSS checks run against the page's <style> blocks, parsed on first use; a
+    submission without any markup is taken to be a plain stylesheet.
+    """
+    def __init__(self, soup, markup=None):
+        self.soup = soup
+        self.markup = markup
+        self._all = {}
+        self._first = {}
+        self._stylesheet = None
+
+    def stylesheet(self):
+        if self._stylesheet is None:
+            if self.markup is not None and not HTML_TAG_RE.search(self.markup):
+                css_text = self.markup
+            else:
+                css_text = '\n'.join(style.get_text() for style in self.soup.find_all('style'))
+            self._stylesheet = CssStylesheet(css_text)
+        return self._stylesheet
+
+    def script(self):
+        """The page's inline JavaScript (or the whole submission when it contains no markup)."""
+        if self.markup is not None and not HTML_TAG_RE.search(self.markup):
+            return self.markup
+        return '\n;\n'.join(script.get_text() for script in self.soup.find_all('script') if not script.has_attr('src'))
+
+    def select(self, selector):
+        elements = self._all.get(selector.pattern)
+        if elements is None:
+            elements = self._all[selector.pattern] = selector.select(self.soup)
+        return elements
+
+    def select_one(self, selector):
+        if selector.pattern in self._all:
+            elements = self._all[selector.pattern]
+            return elements[0] if elements else None
+        if selector.pattern not in self._first:
+            self._first[selector.pattern] = selector.select_one(self.soup)
+        return self._first[selector.pattern]
+
+    def doctypes(self):
+        # Only a real declaration counts, not text that happens to read '<!doctype'
+        return [f"<!DOCTYPE {node}>" for node in self.soup.contents if isinstance(node, Doctype)]
+
+def _compiled_selector(selector):
+    if not selector:
+        raise ValueError("no selector specified")
+    return soupsieve.compile(selector)
+
+def _compile_doctype_check(req):
+    expected_value = req.value
+    def check(document):
+        doctypes = document.doctypes()
+        if doctypes and expected_value and any(expected_value.lower() in doctype.lower() for doctype in doctypes):
+            return True, f"Doctype '{expected_value}' found."
+        if not doctypes:
+            return False, "Doctype declaration not found."
+        return False, f"Doctype found but does not match '{expected_value}'."
+    return check
+
+def _compile_element_exists_check(req):
+    selector, compiled = req.selector, _compiled_selector(req.selector)
+    def check(document):
+        if document.select_one(compiled) is not None:
+            return True, f"Element '{selector}' found."
+        return False, f"Element '{selector}' not found."
+    return check
+
+def _compile_element_count_check(req):
+    selector, expected_value, compiled = req.selector, req.value, _compiled_selector(req.selector)
+    try:
+        expected_count = int(expected_value) if expected_value is not None else None
+    except ValueError:
+        expected_count = None
+        invalid = f"Invalid expected_value for element_count: '{expected_value}' is not an integer."
+    else:
+        invalid = None
+    def check(document):
+        elements = document.select(compiled)
+        if not elements or expected_value is None:
+            return False, f"No elements matching '{selector}' found or expected count not specified."
+        if invalid:
+            return False, invalid
+        if len(elements) == expected_count:
+            return True, f"Found {expected_count} elements matching '{selector}'."
+        return False, f"Expected {expected_count} elements matching '{selector}', but found {len(elements)}."
+    return check
+
+def _compile_attribute_exists_check(req):
+    selector, attr_name, expected_value = req.selector, req.attribute_name, req.value
+    compiled = _compiled_selector(selector)
+    def check(document):
+        element = document.select_one(compiled)
+        if element is None or not attr_name:
+            return False, f"Element '{selector}' not found or attribute name not specified."
+        if not element.has_attr(attr_name):
+            return False, f"Element '{selector}' does not have attribute '{attr_name}'."
+        if expected_value is None:
+            return True, f"Element '{selector}' has attribute '{attr_name}'."
+        if element[attr_name] == expected_value:
+            return True, f"Element '{selector}' has attribute '{attr_name}' with value '{expected_value}'."
+        return False, f"Element '{selector}' has attribute '{attr_name}' but its value is '{element[attr_name]}' not '{expected_value}'."
+    return check
+
+def _compile_element_has_text_check(req):
+    selector, expected_value, compiled = req.selector, req.value, _compiled_selector(req.selector)
+    def check(document):
+        element = document.select_one(compiled)
+        if element is None or expected_value is None:
+            return False, f"Element '{selector}' not found or expected text not specified."
+        text = element.get_text(strip=True)
+        if text == expected_value:
+            return True, f"Element '{selector}' contains text '{expected_value}'."
+        return False, f"Element '{selector}' contains text '{text}' but expected '{expected_value}'."
+    return check
+
+# check_type -> function compiling a Requirement into check(document) -> (passed, message)
+HTML_CHECKS = {
+    'doctype_exists': _compile_doctype_check,
+    'element_exists': _compile_element_exists_check,
+    'element_count': _compile_element_count_check,
+    'attribute_exists': _compile_attribute_exists_check,
+    'element_has_text': _compile_element_has_text_check,
+}
+
+def compile_html_check(req):
+    """
+    Compiles one Requirement into a check callable. Selectors are compiled here,
+    once; a requirement that cannot be compiled becomes a check that always
+    fails with the compile error, as an invalid selector used to fail at run time.
+    """
+    description = req.description
+    try:
+        if req.check_type in CSS_CHECKS:
+            css_check = CSS_CHECKS[req.check_type](req)
+            return lambda document: css_check(document.stylesheet())
+        compile_check = HTML_CHECKS.get(req.check_type)
+        if compile_check is None:
+            return lambda document: (False, f"Requirement '{description}' failed.")
+        return compile_check(req)
+    except Exception as e:
+        message = f"An error occurred during validation of '{description}': {e}"
+        return lambda document: (False, message)
+
+class HtmlValidationPlan:
+    """
+    A practical session's requirements compiled into check callables. Running
+    the plan parses the learner's HTML once and evaluates every check against
+    that single parse; JavaScript checks (JS_CHECKS) are batched into one run of
+    the page's scripts in the code runner pool. The plan holds no database
+    objects and can be cached.
+    """
+    def __init__(self, requirements):
+        self.checks = []
+        self.code_checks = [] # (position in self.checks, RequirementSpec)
+        for req in requirements:
+            if req.check_type in JS_CHECKS:
+                self.code_checks.append((len(self.checks), RequirementSpec(
+                    req.description, req.check_type, req.selector, req.attribute_name, req.value)))
+                self.checks.append((req.description, None))
+            else:
+                self.checks.append((req.description, compile_html_check(req)))
+
+    def run(self, user_html, parser=None):
+        """Validates a submission; `parser` is an HtmlParserBackend (default: SESSION_HTML_PARSER)."""
+        if not isinstance(user_html, str) or not user_html.strip():
+            return [{'description': 'HTML content provided', 'passed': False, 'message': 'No HTML content provided for validation.'}]
+
+        parser = parser or get_html_parser_backend()
+        try:
+            document = HtmlDocument(parser.parse(user_html), user_html)
+        except Exception as e:
+            # Catch parsing errors from BeautifulSoup
+            return [{'description': 'HTML parsing', 'passed': False, 'message': f'Failed to parse HTML: {e}'}]
+
+        validation_results = []
+        for description, check in self.checks:
+            if check is None:
+                validation_results.append(None) # filled in from the code run below
+                continue
+            try:
+                is_valid, message = check(document)
+            except Exception as e:
+                is_valid, message = False, f"An error occurred during validation of '{description}': {e}"
+            validation_results.append({'description': description, 'passed': is_valid, 'message': message})
+
+        if self.code_checks:
+            code_results = run_code_checks({'main.js': document.script()}, 'main.js', [spec for _, spec in self.code_checks])
+            for (position, _), result in zip(self.code_checks, code_results):
+                validation_results[position] = result
+        return validation_results
+
+class ValidationPlanCache:
+    """
+    In-process LRU cache of compiled HtmlValidationPlans per practical session.
+    A miss costs two reads (the session row and its requirements); a hit none.
+    Sessions are immutable once created; entries expire after
+    SESSION_PLAN_CACHE_TTL seconds so deletions made by another worker are
+    noticed, and deletions in this process invalidate immediately.
+    """
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session_id):
+        session_id = int(session_id)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._plans.get(session_id)
+            if entry is not None and now - entry[0] < self.ttl:
+                self._plans.move_to_end(session_id)
+                return entry[1]
+
+        if db.session.query(PracticalSession.id).filter_by(id=session_id).first() is None:
+            self.invalidate(session_id)
+            return None
+        plan = HtmlValidationPlan(
+            Requirement.query.filter_by(session_id=session_id).order_by(Requirement.id.asc()).all()
+        )
+        with self._lock:
+            self._plans[session_id] = (now, plan)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+        return plan
+
+    def invalidate(self, session_id=None):
+        with self._lock:
+            if session_id is None:
+                self._plans.clear()
+            else:
+                self._plans.pop(int(session_id), None)
+
+session_validation_plans = ValidationPlanCache(
+    max_entries=app.config['SESSION_PLAN_CACHE_SIZE'],
+    ttl=app.config['SESSION_PLAN_CACHE_TTL']
+)
+
 def validate_html_code(user_html, requirements):
     """
     Validates a user's HTML code against a list of requirement objects.
     Returns a list of dictionaries, each indicating the pass/fail status and a message.
+    Routes should run a cached plan from session_validation_plans instead; this
+    compiles the requirements for a single use.
     """
+    return HtmlValidationPlan(requirements).run(user_html)
+
+# --- CSS validation ---
+HTML_TAG_RE = re.compile(r'<[A-Za-z!/?]')
+CSS_COMMENT_RE = re.compile(r'/\*.*?(?:\*/|$)', re.DOTALL)
+CSS_STRUCTURE_RE = re.compile(r'["\'{};]')
+CSS_IMPORTANT_RE = re.compile(r'\s*!\s*important\s*$', re.IGNORECASE)
+CSS_COMBINATOR_RE = re.compile(r'\s*([>+~])\s*')
+CSS_COMBINATOR_CHARS_RE = re.compile(r'[>+~]')
+CSS_NESTING_RE = re.compile(r'["\'(\[]')
+CSS_SPECIFICITY_TOKEN_RE = re.compile(
+    r'#[\w-]+|\.[\w-]+|\[[^\]]*\]|::?[\w-]+(?:\((?:[^()]|\([^()]*\))*\))?|\*|[\w-]+(?:\|[\w-]+)?'
+)
+# Pseudo-elements that may still be written with a single colon
+CSS_LEGACY_PSEUDO_ELEMENTS = {':before', ':after', ':first-line', ':first-letter'}
+# At-rules whose blocks contain ordinary style rules; every other block (@font-face, @keyframes, ...) is skipped
+CSS_GROUPING_AT_RULES = ('@media', '@supports', '@layer', '@container')
+
+def _split_css_top_level(text, separator):
+    """Splits on `separator` outside quotes, parentheses and brackets."""
+    if not CSS_NESTING_RE.search(text):
+        return text.split(separator)
+    parts, depth, quote, start = [], 0, None, 0
+    for i, char in enumerate(text):
+        if quote:
+            if char == quote:
+                quote = None
+        elif char in '"\'':
+            quote = char
+        elif char in '([':
+            depth += 1
+        elif char in ')]':
+            depth = max(0, depth - 1)
+        elif char == separator and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return parts
+
+def normalize_css_selector(selector):
+    """Canonical spelling of a selector: single spaces, no spaces around combinators."""
+    selector = ' '.join(selector.split())
+    return CSS_COMBINATOR_RE.sub(lambda match: match.group(1), selector) if CSS_COMBINATOR_CHARS_RE.search(selector) else selector
+
+def normalize_css_value(value):
+    return ' '.join(value.split()).lower()
+
+def css_specificity(selector):
+    """Returns the (ids, classes, types) specificity of a single complex selector."""
+    ids = classes = types = 0
+    for token in CSS_SPECIFICITY_TOKEN_RE.findall(selector):
+        if token.startswith('#'):
+            ids += 1
+        elif token.startswith(('.', '[')):
+            classes += 1
+        elif token.startswith('::') or token.lower() in CSS_LEGACY_PSEUDO_ELEMENTS:
+            types += 1
+        elif token.startswith(':'):
+            name, _, arguments = token.partition('(')
+            name = name.lower()
+            if name == ':where':
+                continue
+            if name in (':not', ':is', ':matches', ':has'):
+                # Counts as its most specific argument
+                a, b, c = max(css_specificity(argument) for argument in _split_css_top_level(arguments[:-1], ','))
+                ids, classes, types = ids + a, classes + b, types + c
+            else:
+                classes += 1
+        elif token != '*':
+            types += 1
+    return ids, classes, types
+
+def parse_css_specificity(value):
+    """Parses an expected specificity written as '0,1,1', '0 1 1' or '(0, 1, 1)'."""
+    numbers = [int(number) for number in re.findall(r'\d+', value or '')]
+    if len(numbers) != 3:
+        raise ValueError(f"'{value}' is not a specificity like '0,1,1'")
+    return tuple(numbers)
+
+class CssStylesheet:
+    """
+    A stylesheet parsed once into an indexed rule map: (media, selector) ->
+    {property: value}. `media` is the enclosing at-rule prelude (e.g.
+    '@media (max-width: 600px)') or '' at the top level; selector lists are
+    split so every selector has its own entry, and later declarations win as in
+    the cascade unless an earlier one is !important. Secondary indexes by
+    property and by specificity make every check a dictionary lookup.
+    """
+    def __init__(self, css_text):
+        self.rules = {}
+        self.important = set() # (media, selector, property) declared !important
+        self.by_property = {}
+        self.by_specificity = {}
+        self._parse_block(CSS_COMMENT_RE.sub('', css_text or ''), '')
+
+    def _parse_block(self, text, media):
+        depth, quote, prelude_start, body_start = 0, None, 0, None
+        # Only quotes, braces and semicolons matter at this level; jump between them
+        for match in CSS_STRUCTURE_RE.finditer(text):
+            i, char = match.start(), match.group()
+            if quote:
+                if char == quote:
+                    quote = None
+            elif char in '"\'':
+                quote = char
+            elif char == '{':
+                if depth == 0:
+                    body_start = i + 1
+                depth += 1
+            elif char == '}' and depth:
+                depth -= 1
+                if depth == 0:
+                    self._add_block(text[prelude_start:body_start - 1], text[body_start:i], media)
+                    prelude_start = i + 1
+            elif char == ';' and depth == 0:
+                prelude_start = i + 1 # a statement at-rule such as @import or @charset
+        if depth and body_start is not None:
+            # Unclosed final block: browsers close it at the end of the stylesheet
+            self._add_block(text[prelude_start:body_start - 1], text[body_start:], media)
+
+    def _add_block(self, prelude, body, media):
+        prelude = ' '.join(prelude.split())
+        if prelude.startswith('@'):
+            if prelude.lower().startswith(CSS_GROUPING_AT_RULES):
+                self._parse_block(body, f"{media} {prelude}".strip())
+            return
+        declarations = []
+        for declaration in _split_css_top_level(body, ';'):
+            name, colon, value = declaration.partition(':')
+            if colon and name.strip() and value.strip():
+                important = bool(CSS_IMPORTANT_RE.search(value))
+                declarations.append((name.strip().lower(), CSS_IMPORTANT_RE.sub('', value).strip(), important))
+        for selector in _split_css_top_level(prelude, ','):
+            selector = normalize_css_selector(selector)
+            if not selector:
+                continue
+            key = (media, selector)
+            rule = self.rules.setdefault(key, {})
+            self.by_specificity.setdefault(css_specificity(selector), set()).add(key)
+            for name, value, important in declarations:
+                if name in rule and (key + (name,)) in self.important and not important:
+                    continue
+                rule[name] = value
+                if important:
+                    self.important.add(key + (name,))
+                self.by_property.setdefault(name, set()).add(key)
+
+    def rule(self, selector):
+        """
+        Returns the declarations for a requirement selector, or None. A selector
+        inside an at-rule is written the way it appears in CSS, e.g.
+        '@media (max-width: 600px) { .nav }'.
+        """
+        return self.rules.get(css_rule_key(selector))
+
+def css_rule_key(selector):
+    """Turns a requirement selector into the (media, selector) key of CssStylesheet.rules."""
+    selector = selector.strip()
+    if selector.startswith('@') and '{' in selector:
+        media, _, inner = selector.partition('{')
+        return ' '.join(media.split()), normalize_css_selector(inner.rstrip().rstrip('}'))
+    return '', normalize_css_selector(selector)
+
+def _compile_rule_exists_check(req):
+    selector = req.selector
+    if not selector:
+        raise ValueError("no selector specified")
+    key = css_rule_key(selector)
+    def check(stylesheet):
+        if key in stylesheet.rules:
+            return True, f"CSS rule '{selector}' found."
+        return False, f"CSS rule '{selector}' not found."
+    return check
+
+def _compile_property_value_check(req):
+    selector, property_name, expected_value = req.selector, (req.attribute_name or '').strip().lower(), req.value
+    if not selector or not property_name:
+        raise ValueError("a selector and a property (attribute_name) are required")
+    key = css_rule_key(selector)
+    expected = normalize_css_value(CSS_IMPORTANT_RE.sub('', expected_value)) if expected_value is not None else None
+    def check(stylesheet):
+        rule = stylesheet.rules.get(key)
+        if rule is None:
+            return False, f"CSS rule '{selector}' not found."
+        if property_name not in rule:
+            return False, f"CSS rule '{selector}' does not set '{property_name}'."
+        if expected is None:
+            return True, f"CSS rule '{selector}' sets '{property_name}'."
+        if normalize_css_value(rule[property_name]) == expected:
+            return True, f"CSS rule '{selector}' sets '{property_name}' to '{expected_value}'."
+        return False, f"CSS rule '{selector}' sets '{property_name}' to '{rule[property_name]}' not '{expected_value}'."
+    return check
+
+def _compile_selector_specificity_check(req):
+    """Passes if some rule (declaring attribute_name, when given) uses a selector of exactly the expected specificity."""
+    specificity = parse_css_specificity(req.value)
+    property_name = (req.attribute_name or '').strip().lower() or None
+    written = ','.join(map(str, specificity))
+    def check(stylesheet):
+        candidates = stylesheet.by_specificity.get(specificity, ())
+        if property_name is not None:
+            candidates = [key for key in candidates if key in stylesheet.by_property.get(property_name, ())]
+        if candidates:
+            selector = sorted(candidates)[0][1]
+            return True, f"Selector '{selector}' has specificity ({written})."
+        if property_name is not None:
+            return False, f"No rule setting '{property_name}' uses a selector with specificity ({written})."
+        return False, f"No selector with specificity ({written}) found."
+    return check
+
+# check_type -> function compiling a Requirement into check(stylesheet) -> (passed, message)
+CSS_CHECKS = {
+    'rule_exists': _compile_rule_exists_check,
+    'property_value': _compile_property_value_check,
+    'selector_specificity': _compile_selector_specificity_check,
+}
+
+def validate_css_code(user_css, requirements):
+    """
+    Validates a user's CSS code against a list of requirement objects.
+    The stylesheet is parsed once; every requirement is then a lookup in its rule map.
+    Returns a list of dictionaries, each indicating the pass/fail status and a message.
+    """
+    if not isinstance(user_css, str) or not user_css.strip():
+        return [{'description': 'CSS content provided', 'passed': False, 'message': 'No CSS content provided for validation.'}]
+
+    stylesheet = CssStylesheet(user_css)
     validation_results = []
-    
-    if not isinstance(user_html, str) or not user_html.strip():
-        return [{'description': 'HTML content provided', 'passed': False, 'message': 'No HTML content provided for validation.'}]
-    
-    try:
-        soup = BeautifulSoup(user_html, 'html.parser')
-    except Exception as e:
-        # Catch parsing errors from BeautifulSoup
-        return [{'description': 'HTML parsing', 'passed': False, 'message': f'Failed to parse HTML: {e}'}]
+    for req in requirements:
+        try:
+            compile_check = CSS_CHECKS.get(req.check_type)
+            if compile_check is None:
+                is_valid, message = False, f"Requirement '{req.description}' failed."
+            else:
+                is_valid, message = compile_check(req)(stylesheet)
+        except Exception as e:
+            is_valid, message = False, f"An error occurred during validation of '{req.description}': {e}"
+        validation_results.append({'description': req.description, 'passed': is_valid, 'message': message})
+    return validation_results
+
+# --- JavaScript and backend (Node.js) validation ---
+CodeRunResult = namedtuple('CodeRunResult', ['results', 'error', 'output'])
+RequirementSpec = namedtuple('RequirementSpec', ['description', 'check_type', 'selector', 'attribute_name', 'value'])
 
-    for req in requirements:
-        check_type = req.check_type
-        selector = req.selector
-        attr_name = req.attribute_name
-        expected_value = req.value
-        is_valid = False
-        message = f"Requirement '{req.description}' failed."
+# Memory allowed on top of CODE_RUNNER_MEMORY_MB for node itself, the young generation and buffers such as typed arrays
+CODE_RUNNER_NODE_OVERHEAD_MB = 128
+
+def _limit_code_runner_resources(cpu_seconds, memory_mb):
+    """
+    Applied in each runner process before node starts (POSIX only).
+    --max-old-space-size only caps V8's JavaScript heap; typed arrays and other
+    buffers are allocated outside it, so the process's data segment is capped too.
+    RLIMIT_DATA is used rather than RLIMIT_AS because V8 reserves far more
+    address space than it ever touches.
+    """
+    try:
+        import resource
+    except ImportError:
+        return lambda: None
+    data_bytes = (memory_mb + CODE_RUNNER_NODE_OVERHEAD_MB) * 1024 * 1024
+    cpu_limit = max(1, math.ceil(cpu_seconds))
+    def apply_limits():
+        os.setsid() # own process group, so a timeout kills everything it started
+        # SIGXCPU at the soft limit ends the run; SIGKILL one second later if it is ignored
+        resource.setrlimit(resource.RLIMIT_CPU, (cpu_limit, cpu_limit + 1))
+        resource.setrlimit(resource.RLIMIT_DATA, (data_bytes, data_bytes))
+        resource.setrlimit(resource.RLIMIT_FSIZE, (0, 0))
+        resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+        resource.setrlimit(resource.RLIMIT_NOFILE, (64, 64))
+    return apply_limits
+
+def _kill_process_group(process):
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except (AttributeError, OSError):
+        process.kill()
+    process.wait()
 
+class CodeRunnerPool:
+    """
+    Runs every submission in its own short-lived node process (sandbox_runner.js),
+    so nothing one submission does can reach another. Each process is capped in
+    CPU time (CODE_RUNNER_CPU_SECONDS for the whole submission), memory, files
+    and wall-clock time. At most `size` processes run at once per web worker, and
+    a submission waits at most its wall-clock cap for a free slot.
+    """
+    # vm microtaskMode and the permission model need Node.js 20+
+    MIN_NODE_VERSION = 20
+
+    def __init__(self, size, node, harness, timeout, cpu_seconds, memory_mb, permission_flag):
+        self.size = size
+        self.node = node
+        self.harness = harness
+        self.timeout = timeout
+        self.cpu_seconds = cpu_seconds
+        self.memory_mb = memory_mb
+        self.permission_flag = permission_flag
+        self.workdir = None
+        self._slots = threading.BoundedSemaphore(size)
+        self._node_error = None
+        self._node_checked = False
+        self._lock = threading.Lock()
+
+    def node_args(self):
+        args = [self.node, '--disallow-code-generation-from-strings', '--no-warnings',
+                f'--max-old-space-size={self.memory_mb}']
+        if self.permission_flag:
+            args += [self.permission_flag, f'--allow-fs-read={self.harness}']
+        return args
+
+    def _check_node(self):
+        """
+        Returns why the configured node cannot run the harness (missing, older than
+        MIN_NODE_VERSION, or rejecting one of the runner flags), or None if it can.
+        Otherwise every runner would exit at once and each submission would be
+        reported as having exceeded its limits.
+        """
+        if shutil.which(self.node) is None:
+            return f"JavaScript validation requires Node.js ('{self.node}' was not found on PATH)."
         try:
-            if check_type == "doctype_exists":
-                doctype = soup.find(text=lambda text: isinstance(text, str) and text.lower().startswith('<!doctype'))
-                if doctype and expected_value and expected_value.lower() in doctype.lower():
-                    is_valid = True
-                    message = f"Doctype '{expected_value}' found."
-                elif not doctype:
-                    message = "Doctype declaration not found."
-                else:
-                    message = f"Doctype found but does not match '{expected_value}'."
-            
-            elif check_type == "element_exists":
-                element = soup.select_one(selector)
-                if element:
-                    is_valid = True
-                    message = f"Element '{selector}' found."
-                else:
-                    message = f"Element '{selector}' not found."
+            version = subprocess.run([self.node, '--version'], capture_output=True, text=True, timeout=10).stdout.strip()
+            match = re.match(r'v(\d+)\.', version)
+            if not match or int(match.group(1)) < self.MIN_NODE_VERSION:
+                return (f"JavaScript validation requires Node.js {self.MIN_NODE_VERSION} or later "
+                        f"('{self.node}' is {version or 'an unknown version'}).")
+            probe = subprocess.run(self.node_args() + ['-e', ''], capture_output=True, text=True, timeout=10)
+        except (OSError, subprocess.TimeoutExpired) as e:
+            return f"Could not start Node.js ('{self.node}'): {e}"
+        if probe.returncode != 0:
+            flags = ' '.join(self.node_args()[1:])
+            return f"Node.js {version} rejected the code runner flags ({flags}); check CODE_RUNNER_PERMISSION_FLAG. {probe.stderr.strip()}"
+        return None
 
-            elif check_type == "element_count":
-                elements = soup.select(selector)
-                if elements and expected_value is not None:
-                    try:
-                        expected_count = int(expected_value)
-                        if len(elements) == expected_count:
-                            is_valid = True
-                            message = f"Found {expected_count} elements matching '{selector}'."
-                        else:
-                            message = f"Expected {expected_count} elements matching '{selector}', but found {len(elements)}."
-                    except ValueError:
-                        message = f"Invalid expected_value for element_count: '{expected_value}' is not an integer."
-                else:
-                    message = f"No elements matching '{selector}' found or expected count not specified."
-            
-            elif check_type == "attribute_exists":
-                element = soup.select_one(selector)
-                if element and attr_name:
-                    if element.has_attr(attr_name):
-                        if expected_value is not None:
-                            if element[attr_name] == expected_value:
-                                is_valid = True
-                                message = f"Element '{selector}' has attribute '{attr_name}' with value '{expected_value}'."
-                            else:
-                                message = f"Element '{selector}' has attribute '{attr_name}' but its value is '{element[attr_name]}' not '{expected_value}'."
-                        else:
-                            is_valid = True
-                            message = f"Element '{selector}' has attribute '{attr_name}'."
-                    else:
-                        message = f"Element '{selector}' does not have attribute '{attr_name}'."
-                else:
-                    message = f"Element '{selector}' not found or attribute name not specified."
-            
-            elif check_type == "element_has_text":
-                element = soup.select_one(selector)
-                if element and expected_value is not None:
-                    if element.get_text(strip=True) == expected_value:
-                        is_valid = True
-                        message = f"Element '{selector}' contains text '{expected_value}'."
-                    else:
-                        message = f"Element '{selector}' contains text '{element.get_text(strip=True)}' but expected '{expected_value}'."
+    def _ensure_ready(self):
+        with self._lock:
+            # The node binary is checked once; the outcome is inherited by forked workers
+            if not self._node_checked:
+                self._node_error = self._check_node()
+                self._node_checked = True
+                if self._node_error:
+                    app.logger.error(self._node_error)
                 else:
-                    message = f"Element '{selector}' not found or expected text not specified."
-            
-            # Add more HTML-specific checks here as needed
-            # elif check_type == "element_contains_child":
-            #     ...
+                    self.workdir = tempfile.mkdtemp(prefix='code-runner-')
+            if self._node_error:
+                raise RuntimeError(self._node_error)
+
+    def _run_process(self, job):
+        process = subprocess.Popen(
+            self.node_args() + [self.harness],
+            stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL,
+            cwd=self.workdir, env={'PATH': os.environ.get('PATH', '')},
+            preexec_fn=_limit_code_runner_resources(self.cpu_seconds, self.memory_mb)
+        )
+        try:
+            stdout, _ = process.communicate(json.dumps(job).encode(), timeout=self.timeout)
+        except subprocess.TimeoutExpired:
+            _kill_process_group(process)
+            return CodeRunResult(None, f"Your code did not finish within {self.timeout:g} seconds.", [])
+        if process.returncode != 0 or not stdout:
+            if process.returncode in (-getattr(signal, 'SIGXCPU', 0), -signal.SIGKILL):
+                return CodeRunResult(None, "Your code was stopped for exceeding its CPU time limit.", [])
+            return CodeRunResult(None, "Your code was stopped for exceeding its memory or CPU limit.", [])
+        try:
+            response = json.loads(stdout.split(b'\n', 1)[0])
+            return CodeRunResult(response['results'], response['error'], response['output'])
+        except (ValueError, KeyError, TypeError):
+            return CodeRunResult(None, "The code runner returned an invalid response.", [])
+
+    def run(self, files, entry, checks, mode='script'):
+        """Runs `entry` of `files` ({name: source}) and evaluates `checks`. Returns a CodeRunResult."""
+        self._ensure_ready()
+        job = {'files': files, 'entry': entry, 'mode': mode, 'checks': checks,
+               'timeout_ms': int(self.cpu_seconds * 1000)}
+        if not self._slots.acquire(timeout=self.timeout):
+            return CodeRunResult(None, "All code runners are busy. Please try again in a moment.", [])
+        try:
+            return self._run_process(job)
+        finally:
+            self._slots.release()
+
+code_runners = CodeRunnerPool(
+    size=app.config['CODE_RUNNER_WORKERS'],
+    node=app.config['CODE_RUNNER_NODE'],
+    harness=os.path.join(app.root_path, 'sandbox_runner.js'),
+    timeout=app.config['CODE_RUNNER_TIMEOUT'],
+    cpu_seconds=app.config['CODE_RUNNER_CPU_SECONDS'],
+    memory_mb=app.config['CODE_RUNNER_MEMORY_MB'],
+    permission_flag=app.config['CODE_RUNNER_PERMISSION_FLAG']
+)
+
+# Check types evaluated by the code runner: js_assert (value: a JavaScript expression that must
+# be truthy, awaited if it is a promise), js_output (value: text the code must print) and
+# js_defines (selector: a global name, attribute_name: optional typeof such as 'function')
+JS_CHECKS = ('js_assert', 'js_output', 'js_defines')
+
+def run_code_checks(files, entry, requirements, mode='script'):
+    """Runs submitted code once in the runner pool and evaluates every requirement against that run."""
+    requirements = list(requirements)
+    checks = [{'type': req.check_type, 'selector': req.selector, 'attribute_name': req.attribute_name, 'value': req.value}
+              for req in requirements]
+    try:
+        result = code_runners.run(files, entry, checks, mode)
+    except RuntimeError as e:
+        result = CodeRunResult(None, str(e), [])
+    if result.results is None:
+        return [{'description': req.description, 'passed': False, 'message': result.error} for req in requirements]
+    return [{'description': req.description, 'passed': check['passed'], 'message': check['message']}
+            for req, check in zip(requirements, result.results)]
 
-        except Exception as e:
-            message = f"An error occurred during validation of '{req.description}': {e}"
-            is_valid = False # Ensure it's marked as failed if an exception occurs during check
+def validate_javascript_code(user_js, requirements):
+    """
+    Validates a user's JavaScript code against a list of requirement objects.
+    The code runs once as a plain script in a sandboxed runner; each requirement
+    is a test assertion evaluated in the same global scope (see JS_CHECKS).
+    Returns a list of dictionaries, each indicating the pass/fail status and a message.
+    """
+    if not isinstance(user_js, str) or not user_js.strip():
+        return [{'description': 'JavaScript content provided', 'passed': False, 'message': 'No JavaScript content provided for validation.'}]
+    return run_code_checks({'main.js': user_js}, 'main.js', requirements)
 
-        validation_results.append({
-            'description': req.description,
-            'passed': is_valid,
-            'message': message
-        })
-            
-    return validation_results
+def validate_backend_code(user_backend_files, requirements):
+    """
+    Validates a user's backend (Node.js) code, given as {filename: source},
+    against a list of requirement objects. The entry file (index.js, app.js,
+    server.js or the first file) is loaded as a CommonJS module; `require` only
+    resolves the submitted files, so assertions can inspect them, e.g.
+    "require('./math.js').add(2, 3) === 5".
+    """
+    if not isinstance(user_backend_files, dict) or not user_backend_files:
+        return [{'description': 'Backend files provided', 'passed': False, 'message': 'No backend files provided for validation.'}]
+    files = {}
+    for name, source in user_backend_files.items():
+        # normpath drops './' segments; names like '.hidden.js' are kept as they are
+        normalized = os.path.normpath(str(name)).lstrip('/')
+        if '..' in normalized.split('/'):
+            return [{'description': 'Backend files provided', 'passed': False, 'message': f"Invalid file name '{name}'."}]
+        files[normalized] = str(source)
+    entry = next((name for name in ('index.js', 'app.js', 'server.js') if name in files), next(iter(files)))
+    return run_code_checks(files, entry, requirements, mode='module')
+
+# --- Session grading (sync or queued) ---
+def grade_session_submission(user, session_id, user_code):
+    """
+    Validates a submission against a session's cached plan and records the
+    completion if every requirement passes. Returns (results, is_complete), or
+    None if the session does not exist.
+    """
+    try:
+        plan = session_validation_plans.get(session_id)
+    except (TypeError, ValueError):
+        plan = None
+    if plan is None:
+        return None
 
-# --- Placeholder for future CSS validation ---
-def validate_css_code(user_css, requirements):
+    results = plan.run(user_code)
+    # `all(result['passed'])` will be True only if every item in the list is True.
+    is_complete = all(result['passed'] for result in results)
+    if is_complete:
+        update_user_progress_and_unlock(user, 'session', int(session_id))
+    return results, is_complete
+
+def grading_queue_depth():
+    return GradingJob.query.filter_by(status='queued').count()
+
+def claim_grading_job():
     """
-    Placeholder for validating a user's CSS code against a list of requirement objects.
-    This function would integrate specialized CSS parsing and validation tools.
-    """
-    # Example:
-    # from css_parser import CSSParser # Hypothetical CSS parser library
-    # parser = CSSParser()
-    # stylesheet = parser.parse(user_css)
-    #
-    # validation_results = []
-    # for req in requirements:
-    #     # Logic to check CSS rules, properties, values, etc.
-    #     # using the parsed stylesheet
-    #     is_valid = False
-    #     message = "CSS validation not yet implemented."
-    #     validation_results.append({
-    #         'description': req.description,
-    #         'passed': is_valid,
-    #         'message': message
-    #     })
-    # return validation_results
-    return [{'description': r.description, 'passed': False, 'message': 'CSS validation not yet implemented.'} for r in requirements]
-
-# --- Placeholder for future JavaScript validation ---
-def validate_javascript_code(user_js, requirements):
+    Claims the oldest queued job (or a running one whose worker was lost) with
+    a compare-and-set UPDATE, so concurrent workers in any process never grade
+    the same job twice. Returns (job_id, claimed_at) or None; claimed_at is the
+    job's new started_at, which identifies this claim to process_grading_job.
+    """
+    stale_before = datetime.datetime.utcnow() - datetime.timedelta(seconds=app.config['GRADING_JOB_TIMEOUT'])
+    candidates = db.session.query(GradingJob.id, GradingJob.status, GradingJob.started_at) \
+        .filter(db.or_(GradingJob.status == 'queued',
+                       db.and_(GradingJob.status == 'running', GradingJob.started_at < stale_before))) \
+        .order_by(GradingJob.id.asc()).limit(5).all()
+    for job_id, status, started_at in candidates:
+        # Only succeeds if no other worker claimed (or re-claimed) the job since it was read
+        unchanged = GradingJob.started_at.is_(None) if started_at is None else GradingJob.started_at == started_at
+        claimed_at = datetime.datetime.utcnow()
+        claimed = GradingJob.query.filter(GradingJob.id == job_id, GradingJob.status == status, unchanged) \
+            .update({GradingJob.status: 'running', GradingJob.started_at: claimed_at}, synchronize_session=False)
+        db.session.commit()
+        if claimed:
+            return job_id, claimed_at
+    return None
+
+def process_grading_job(job_id, claimed_at):
     """
-    Placeholder for validating a user's JavaScript code against a list of requirement objects.
-    This function would integrate specialized JavaScript parsing and validation tools.
+    Grades a claimed job and stores its results. Errors are stored on the job
+    rather than raised. The result is only written while the job still carries
+    this claim: if it was re-claimed after GRADING_JOB_TIMEOUT, the newer claim
+    owns the result. Returns True if the result was stored.
     """
-    return [{'description': r.description, 'passed': False, 'message': 'JavaScript validation not yet implemented.'} for r in requirements]
+    job = db.session.get(GradingJob, job_id)
+    try:
+        graded = grade_session_submission(db.session.get(User, job.user_id), job.session_id, job.submission)
+        if graded is None:
+            outcome = {GradingJob.status: 'failed', GradingJob.error: 'Session not found'}
+        else:
+            results, is_complete = graded
+            outcome = {GradingJob.status: 'done', GradingJob.results: json.dumps(results), GradingJob.is_complete: is_complete}
+    except Exception as e:
+        db.session.rollback()
+        outcome = {GradingJob.status: 'failed', GradingJob.error: f"Grading failed: {e}"}
+    outcome[GradingJob.finished_at] = datetime.datetime.utcnow()
+    outcome[GradingJob.submission] = '' # the code is not needed once graded
+    stored = GradingJob.query.filter_by(id=job_id, status='running', started_at=claimed_at) \
+        .update(outcome, synchronize_session=False)
+    db.session.commit()
+    return stored == 1
 
-# --- Placeholder for future Backend (Node.js) validation ---
-def validate_backend_code(user_backend_files, requirements):
+def purge_grading_jobs():
+    """Deletes finished jobs older than GRADING_JOB_RETENTION. The caller is responsible for committing."""
+    cutoff = datetime.datetime.utcnow() - datetime.timedelta(seconds=app.config['GRADING_JOB_RETENTION'])
+    GradingJob.query.filter(GradingJob.status.in_(('done', 'failed')), GradingJob.finished_at < cutoff) \
+        .delete(synchronize_session=False)
+
+class GradingWorkerPool:
     """
-    Placeholder for validating a user's backend code (e.g., Node.js) against a list of requirement objects.
-    This would involve static analysis, potentially running tests, or deploying in a sandbox.
+    Threads that claim and grade GradingJobs. Jobs enqueued by this process wake
+    a worker immediately; jobs from other processes are picked up within
+    GRADING_POLL_INTERVAL. The number of threads bounds how many submissions
+    this process grades at once. Started on first use after fork, like the
+    code runner pool.
     """
-    return [{'description': r.description, 'passed': False, 'message': 'Backend validation not yet implemented.'} for r in requirements]
+    def __init__(self, size, poll_interval):
+        self.size = size
+        self.poll_interval = poll_interval
+        self._wakeup = threading.Condition()
+        self._pending = 0
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def start(self):
+        with self._lock:
+            if self._pid == os.getpid() or self.size <= 0:
+                return
+            for number in range(self.size):
+                threading.Thread(target=self.work, name=f"grading-worker-{number}", daemon=True).start()
+            self._pid = os.getpid()
+
+    def notify(self):
+        with self._wakeup:
+            self._pending += 1
+            self._wakeup.notify()
+
+    def _wait(self):
+        with self._wakeup:
+            if not self._pending:
+                self._wakeup.wait(self.poll_interval)
+            self._pending = max(0, self._pending - 1)
+
+    def work(self, stop=None):
+        """Claims and grades jobs until `stop` (a threading.Event) is set; forever by default."""
+        graded = 0
+        while stop is None or not stop.is_set():
+            with app.app_context():
+                try:
+                    claim = claim_grading_job()
+                    if claim is not None:
+                        if not process_grading_job(*claim):
+                            app.logger.warning(f"Grading job {claim[0]} was re-claimed before it finished; result discarded")
+                        graded += 1
+                        if graded % 100 == 0:
+                            purge_grading_jobs()
+                            db.session.commit()
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.exception(f"Grading worker error: {e}")
+                    claim = None
+                finally:
+                    db.session.remove()
+            if claim is None:
+                self._wait()
+
+grading_workers = GradingWorkerPool(size=app.config['GRADING_WORKERS'], poll_interval=app.config['GRADING_POLL_INTERVAL'])
+
+def grading_job_payload(job):
+    payload = {'job_id': job.id, 'status': job.status}
+    if job.status == 'queued':
+        payload['position'] = GradingJob.query.filter(GradingJob.status == 'queued', GradingJob.id < job.id).count() + 1
+    elif job.status == 'done':
+        payload['results'] = json.loads(job.results)
+        payload['is_complete'] = job.is_complete
+    elif job.status == 'failed':
+        payload['error'] = job.error
+    return payload
 
 # app.py -> API ROUTES section    
         
@@ -427,24 +2984,19 @@ def check_lab_step():
     except (TypeError, ValueError):
         return jsonify({'error': 'Invalid or missing data'}), 400
 
-    step = LabStep.query.get(step_id)
+    # Step metadata comes from the compiled lab cache; only the progress row is written
+    step = lab_steps.step(step_id)
     if not step:
         return jsonify({'error': 'Step not found'}), 404
 
-    cleaned_user_input = user_input.strip()
-    is_correct = (cleaned_user_input == step.match_text)
+    is_correct = step.matcher(str(user_input))
 
     if is_correct:
-        progress = LabProgress.query.filter_by(user_id=current_user.id, lab_id=step.lab_id).first()
-        if progress and progress.current_step_number == step.step_number:
-            progress.current_step_number += 1
-            db.session.commit()
+        advance_lab_progress(current_user.id, step.lab_id, step.step_number)
         
         # --- NEW COMPLETION LOGIC ---
-        total_steps = len(step.lab.steps) # Get total steps from the relationship
-        
         # Check if the step they just finished was the last one
-        if step.step_number >= total_steps:
+        if step.step_number >= step.step_count:
             # --- NEW PROGRESS HOOK ---
             # User has just completed the final step of the lab.
             update_user_progress_and_unlock(current_user, 'lab', step.lab_id)
@@ -454,6 +3006,8 @@ def check_lab_step():
             # Otherwise, generate the URL for the next step
             next_step_number = step.step_number + 1
             next_url = url_for('lab_step_viewer', lab_id=step.lab_id, step_number=next_step_number)
+        # The progress update and any completion records go out in one transaction
+        db.session.commit()
         
         return jsonify({'correct': True, 'next_url': next_url})
         # --- END OF NEW LOGIC ---
@@ -472,22 +3026,52 @@ def validate_session():
     if not session_id or user_code is None:
         return jsonify({'error': 'Missing session_id or user_code'}), 400
 
-    session = PracticalSession.query.get(session_id)
-    if not session:
+    if app.config['SESSION_GRADING_MODE'] == 'queue':
+        # Queue mode: store the submission and let a grading worker pick it up; the client polls the job
+        if db.session.query(PracticalSession.id).filter_by(id=session_id).first() is None:
+            return jsonify({'error': 'Session not found'}), 404
+        queue_depth = grading_queue_depth()
+        if queue_depth >= app.config['GRADING_QUEUE_MAX_DEPTH']:
+            return jsonify({'error': 'The grading queue is full. Please try again in a moment.', 'queue_depth': queue_depth}), 503
+        job = GradingJob(user_id=current_user.id, session_id=session_id, submission=str(user_code))
+        db.session.add(job)
+        db.session.commit()
+        grading_workers.start()
+        grading_workers.notify()
+        return jsonify({'job_id': job.id, 'status': 'queued', 'queue_depth': queue_depth + 1,
+                        'poll_url': url_for('session_grading_job', job_id=job.id)}), 202
+
+    # The session's requirements are compiled once and cached; each submission is parsed once
+    graded = grade_session_submission(current_user, session_id, user_code)
+    if graded is None:
         return jsonify({'error': 'Session not found'}), 404
-        
-    # Use our powerful validator function from Subtask 4.2
-    results = validate_html_code(user_code, session.requirements)
-    
-    # --- NEW PROGRESS HOOK LOGIC ---
-    # `all(result['passed'])` will be True only if every item in the list is True.
-    is_complete = all(result['passed'] for result in results)
-    
-    if is_complete:
-        update_user_progress_and_unlock(current_user, 'session', session_id)
+    results, is_complete = graded
     
     # Return both the individual results and the overall completion status
     return jsonify({'results': results, 'is_complete': is_complete})
+
+@app.route("/api/session/jobs/<int:job_id>")
+@login_required
+def session_grading_job(job_id):
+    """Status of a queued grading job; includes the results once it is done."""
+    job = GradingJob.query.filter_by(id=job_id, user_id=current_user.id).first()
+    if job is None:
+        return jsonify({'error': 'Job not found'}), 404
+    return jsonify(grading_job_payload(job))
+
+@app.route("/api/grading/queue")
+@login_required
+def grading_queue_status():
+    if current_user.role != 'admin':
+        return jsonify({'error': 'Permission denied'}), 403
+    counts = dict(db.session.query(GradingJob.status, func.count(GradingJob.id)).group_by(GradingJob.status).all())
+    return jsonify({
+        'mode': app.config['SESSION_GRADING_MODE'],
+        'queued': counts.get('queued', 0),
+        'running': counts.get('running', 0),
+        'max_depth': app.config['GRADING_QUEUE_MAX_DEPTH'],
+        'workers_per_process': grading_workers.size
+    })
 # app.py -> ROUTES section
 
 # ... (after lab_list route)
@@ -522,13 +3106,14 @@ def note_viewer(module_item_id):
 
     full_path = os.path.join(app.root_path, module_item.content_path)
     try:
-        with open(full_path, 'r', encoding='utf-8') as f:
-            content = f.read()
+        # Rendered HTML comes from the note cache; the file is only read and
+        # converted when it is new or has changed on disk.
+        html = note_cache.render(full_path)
         
         # Create a dummy note object for the template
         note = {
             'title': module_item.content_object['title'], # Use the title from content_object
-            'content': content
+            'html': html
         }
         return render_template('note_viewer.html', note=note)
     except FileNotFoundError:
@@ -568,68 +3153,41 @@ def curriculum_viewer(path_segments=""):
                                user_progress_map=user_progress_map,
                                parent_entity=None)
 
-    # Traverse the path segments
-    for i, slug in enumerate(slugs):
-        if i == 0: # First segment must be a Module
-            entity = Module.query.filter_by(slug=slug, is_published=True).first()
-            if not entity:
-                flash(f"Module '{slug}' not found.", 'danger')
-                return redirect(url_for('course_dashboard'))
-            current_entity = entity
-            current_parent_type = 'module'
-            current_parent_id = entity.id
-        else: # Subsequent segments can be Submodules or the final ModuleItem
-            if current_parent_type == 'module':
-                # Look for a top-level submodule of the current module
-                entity = Submodule.query.filter_by(
-                    module_id=current_entity.id, 
-                    parent_id=None, 
-                    slug=slug
-                ).first()
-            elif current_parent_type == 'submodule':
-                # Look for a nested submodule of the current submodule
-                entity = Submodule.query.filter_by(
-                    parent_id=current_entity.id, 
-                    slug=slug
-                ).first()
-            else:
-                # This case should ideally not be reached if logic is sound
-                flash("Invalid path segment encountered.", 'danger')
-                return redirect(url_for('course_dashboard'))
+    # Resolve the whole path with one lookup against the precomputed path index
+    path_entry = db.session.query(CurriculumPath) \
+        .join(Module, CurriculumPath.module_id == Module.id) \
+        .filter(CurriculumPath.path == '/'.join(slugs), Module.is_published == True) \
+        .first()
 
-            if not entity:
-                # If not a submodule, it might be a ModuleItem (file)
-                # This assumes ModuleItems are always the last segment in a path
-                if i == len(slugs) - 1: # It's the last segment
-                    module_item = ModuleItem.query.filter(
-                        ModuleItem.submodule_id == current_entity.id,
-                        ModuleItem.content_path.like(f'%/{slug}') # Match by filename
-                    ).first()
-                    
-                    if module_item:
-                        # Redirect to the specific viewer for the content type
-                        if module_item.content_type == 'quiz':
-                            return redirect(url_for('quiz_viewer', quiz_id=module_item.content_id))
-                        elif module_item.content_type == 'lab':
-                            return redirect(url_for('start_lab', lab_id=module_item.content_id))
-                        elif module_item.content_type == 'session':
-                            return redirect(url_for('session_viewer', session_id=module_item.content_id))
-                        elif module_item.content_type == 'note':
-                            # For notes, we need to pass the module_item_id to the note_viewer
-                            return redirect(url_for('note_viewer', module_item_id=module_item.id))
-                        else:
-                            flash("Unsupported content type.", 'danger')
-                            return redirect(url_for('course_dashboard'))
-                    else:
-                        flash(f"Content '{slug}' not found.", 'danger')
-                        return redirect(url_for('course_dashboard'))
-                else:
-                    flash(f"Path segment '{slug}' not found.", 'danger')
-                    return redirect(url_for('course_dashboard'))
-            
-            current_entity = entity
-            current_parent_type = 'submodule'
-            current_parent_id = entity.id
+    if not path_entry:
+        if len(slugs) == 1:
+            flash(f"Module '{slugs[0]}' not found.", 'danger')
+        else:
+            flash(f"Content '{slugs[-1]}' not found.", 'danger')
+        return redirect(url_for('course_dashboard'))
+
+    if path_entry.entity_type == 'module_item':
+        module_item = ModuleItem.query.get_or_404(path_entry.entity_id)
+        # Redirect to the specific viewer for the content type
+        if module_item.content_type == 'quiz':
+            return redirect(url_for('quiz_viewer', quiz_id=module_item.content_id))
+        elif module_item.content_type == 'lab':
+            return redirect(url_for('start_lab', lab_id=module_item.content_id))
+        elif module_item.content_type == 'session':
+            return redirect(url_for('session_viewer', session_id=module_item.content_id))
+        elif module_item.content_type == 'note':
+            # For notes, we need to pass the module_item_id to the note_viewer
+            return redirect(url_for('note_viewer', module_item_id=module_item.id))
+        else:
+            flash("Unsupported content type.", 'danger')
+            return redirect(url_for('course_dashboard'))
+    elif path_entry.entity_type == 'module':
+        current_entity = Module.query.get_or_404(path_entry.entity_id)
+        current_parent_type = 'module'
+    else:
+        current_entity = Submodule.query.get_or_404(path_entry.entity_id)
+        current_parent_type = 'submodule'
+    current_parent_id = current_entity.id
 
     # If we reached here, current_entity is either a Module or a Submodule
     # We need to display its children (submodules and module items)
@@ -699,8 +3257,8 @@ def download_certificate(certificate_id):
 @login_required
 def check_module_completion(module_id):
     module = Module.query.get_or_404(module_id)
-    user_progress_map = get_user_progress_map(current_user.id)
-    progress_percent = calculate_module_progress(module, user_progress_map)
+    module_progress_counts = get_module_progress_counts(current_user.id)
+    progress_percent = calculate_module_progress(module, module_progress_counts)
 
     if progress_percent == 100:
         # Check if a certificate has already been earned
@@ -809,6 +3367,14 @@ def get_content_by_type(content_type):
 
     return jsonify({'status': 'success', 'content': content_list})
 
+@app.route("/admin/api/note_cache_stats", methods=['GET'])
+@login_required
+def note_cache_stats():
+    if current_user.role != 'admin':
+        return jsonify({'status': 'error', 'message': 'Permission denied'}), 403
+
+    return jsonify({'status': 'success', 'stats': note_cache.stats()})
+
 # app.py -> API ROUTES section
 @app.route("/api/quiz/check_answer", methods=['POST'])
 @login_required
@@ -821,19 +3387,52 @@ def check_answer():
     if not question_id or not option_id:
         return jsonify({'error': 'Missing data'}), 400
 
-    selected_option = Option.query.get(option_id)
-    if not selected_option or selected_option.question_id != question_id:
+    quiz_id = db.session.query(Question.quiz_id).filter_by(id=question_id).scalar()
+    answer_key = quiz_answer_keys.get(quiz_id, seed=get_quiz_attempt_seed(quiz_id)) if quiz_id else None
+    if answer_key is None:
+        return jsonify({'error': 'Invalid option'}), 404
+
+    try:
+        results, _ = grade_quiz_answers(answer_key, {question_id: option_id})
+    except (TypeError, ValueError):
         return jsonify({'error': 'Invalid option'}), 404
 
-    is_correct = selected_option.is_correct
+    # Checks have their own lockout counter, so answers cannot be probed freely
+    # and checking does not use up the learner's submission
+    retry_after = acquire_quiz_attempt(current_user.id, quiz_id, kind='check')
+    if retry_after:
+        return quiz_lockout_response(retry_after)
 
-    # If the answer is wrong, we need to send back the ID of the correct answer
-    # so the frontend can highlight it for the user.
-    if not is_correct:
-        correct_option = Option.query.filter_by(question_id=question_id, is_correct=True).first()
-        return jsonify({'correct': False, 'correct_option_id': correct_option.id})
-    else:
-        return jsonify({'correct': True, 'correct_option_id': selected_option.id})
+    # Only whether the answer is right; the correct option is revealed by submit_result alone.
+    return jsonify({'correct': results[int(question_id)]['correct']})
+
+@app.route("/api/quiz/<int:quiz_id>/grade", methods=['POST'])
+@login_required
+def grade_quiz(quiz_id):
+    """Grades all {question_id: option_id} answers of a quiz in one request."""
+    data = request.get_json(silent=True) or {}
+    answers = data.get('answers')
+
+    if not isinstance(answers, dict) or not answers:
+        return jsonify({'error': 'Missing data'}), 400
+
+    answer_key = quiz_answer_keys.get(quiz_id, seed=get_quiz_attempt_seed(quiz_id))
+    if answer_key is None:
+        return jsonify({'error': 'Quiz not found'}), 404
+
+    try:
+        results, score = grade_quiz_answers(answer_key, answers)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid option'}), 400
+
+    # Counted like check_answer, apart from submissions
+    retry_after = acquire_quiz_attempt(current_user.id, quiz_id, kind='check')
+    if retry_after:
+        return quiz_lockout_response(retry_after)
+
+    # Only right/wrong per question; the correct options are revealed by submit_result alone.
+    results = {question_id: {'correct': result['correct']} for question_id, result in results.items()}
+    return jsonify({'results': results, 'score': score, 'total': len(answer_key.correct_options)})
 # app.py
 
 # ... (in your API ROUTES section) ...
@@ -841,31 +3440,60 @@ def check_answer():
 @app.route("/api/quiz/submit_result", methods=['POST'])
 @login_required
 def submit_result():
-    data = request.get_json()
+    data = request.get_json(silent=True) or {}
     quiz_id = data.get('quiz_id')
-    score = data.get('score')
-    
-    quiz = Quiz.query.get(quiz_id)
-    if not quiz:
+    answers = data.get('answers')
+
+    if not quiz_id or not isinstance(answers, dict):
+        return jsonify({'error': 'Missing data'}), 400
+
+    # The score is always computed here from the submitted answers; a client-supplied score is ignored.
+    # For pooled quizzes the key only covers the questions drawn for this attempt.
+    seed = get_quiz_attempt_seed(quiz_id)
+    answer_key = quiz_answer_keys.get(quiz_id, seed=seed)
+    if answer_key is None:
         return jsonify({'error': 'Quiz not found'}), 404
+    if not answer_key.correct_options:
+        return jsonify({'error': 'No open attempt for this quiz. Please reload the quiz.'}), 400
+
+    # Malformed answers are rejected before the lockout so they do not use up an attempt
+    try:
+        results, score = grade_quiz_answers(answer_key, answers)
+    except (TypeError, ValueError):
+        return jsonify({'error': 'Invalid option'}), 400
+
+    # Lockout: recorded before anything is saved or returned, so a locked-out learner learns nothing
+    retry_after = acquire_quiz_attempt(current_user.id, answer_key.quiz_id)
+    if retry_after:
+        return quiz_lockout_response(retry_after)
 
-    passed = score >= quiz.passing_score
+    passed = score >= answer_key.passing_score
 
-    # Create a new attempt record
+    # Create a new attempt record and fold it into the learner's dashboard stats
     attempt = QuizAttempt(
         score=score,
         passed=passed,
         user_id=current_user.id,
-        quiz_id=quiz_id
+        quiz_id=answer_key.quiz_id,
+        seed=seed
     )
+    quiz_title, quiz_category = db.session.query(Quiz.title, Quiz.category).filter_by(id=answer_key.quiz_id).one()
+    record_quiz_attempt_stats(attempt, quiz_title, quiz_category)
     db.session.add(attempt)
     db.session.commit()
+    close_quiz_attempt(answer_key.quiz_id)
     
     if passed:
-        update_user_progress_and_unlock(current_user, 'quiz', quiz_id)
+        update_user_progress_and_unlock(current_user, 'quiz', answer_key.quiz_id)
     # --- END OF HOOK ---
     
-    return jsonify({'status': 'success', 'passed': passed})
+    return jsonify({
+        'status': 'success',
+        'passed': passed,
+        'score': score,
+        'total': len(answer_key.correct_options),
+        'results': results
+    })
 
 @app.route("/api/toggle_publish/<string:entity_type>/<int:entity_id>", methods=['POST'])
 @login_required
@@ -912,31 +3540,54 @@ def toggle_publish(entity_type, entity_id):
 
 @app.cli.command("process-quiz")
 @click.argument("filepath")
-def process_quiz(filepath):
-    # ... (the full code for this function)
-    # This can now safely call parse_quiz_markdown because it was defined above.
+@click.option("--category", type=click.Choice(list(QUIZ_CATEGORIES)), default=None,
+              help="Quiz category. By default it is chosen by question count.")
+def process_quiz(filepath, category):
+    """Processes a markdown quiz file and adds it to the database."""
     print(f"Attempting to process quiz file: {filepath}")
     try:
-        with open(filepath, 'r') as f:
-            content = f.read()
+        with open(filepath, 'r', encoding='utf-8') as f:
+            parsed_data, parse_errors = parse_quiz_lines(f)
     except FileNotFoundError:
         print(f"Error: File not found at '{filepath}'")
         return
 
-    parsed_data = parse_quiz_markdown(content) # This will work now
-    # ... (rest of the function)
-    if not parsed_data:
-        print("Error: Parsing failed. Please check the file format. Aborting.")
+    if parse_errors:
+        for error in parse_errors:
+            print(f"  Line {error.line}: {error.message}")
+        print(f"Error: Parsing failed with {len(parse_errors)} problem(s). Aborting.")
         return
-    
-    # ... (rest of the database logic) ...
+
+    category = quiz_category_for(len(parsed_data), category)
+    if category is None:
+        print(f"Error: {len(parsed_data)} questions do not match a quiz category. Aborting.")
+        return
+
+    filename = os.path.basename(filepath)
+    if Quiz.query.filter_by(filename=filename).first():
+        print(f"Error: A quiz with the filename '{filename}' already exists. Aborting.")
+        return
+
+    try:
+        new_quiz = create_quiz(filename, parsed_data, category)
+        db.session.commit()
+        print(f"SUCCESS! Quiz '{new_quiz.title}' ({QUIZ_CATEGORIES[category]['name']}) has been added to the database.")
+    except Exception as e:
+        db.session.rollback()
+        print(f"DATABASE ERROR: {e}")
+        print("Transaction has been rolled back. No changes were saved.")
 
 @app.cli.command("automate-curriculum")
 @click.argument("path", default="static/uploads/curriculum")
-def automate_curriculum(path):
+@click.option("--compile-notes", "compile_notes_flag", is_flag=True,
+              help="Pre-render every note to HTML so requests never run Markdown.")
+@click.option("--sync", is_flag=True,
+              help="Apply only the differences to the existing curriculum and keep learner progress.")
+def automate_curriculum(path, compile_notes_flag, sync):
     """
     Automates the creation of modules, submodules, and content notes
     from a directory structure, clearing existing data first.
+    With --sync, existing rows are updated in place instead.
     """
     click.echo("--- Automating Curriculum from File System ---")
     root_curriculum_path = os.path.join(app.root_path, path)
@@ -945,89 +3596,68 @@ def automate_curriculum(path):
         click.echo(f"Error: Curriculum root directory not found at '{root_curriculum_path}'")
         return
 
+    def _compile_notes_phase():
+        click.echo("Compiling notes to HTML...")
+        note_paths = [row.content_path for row in db.session.query(ModuleItem.content_path)
+                      .filter(ModuleItem.content_type == 'note', ModuleItem.content_path.isnot(None)).all()]
+        counts = compile_notes(note_paths)
+        db.session.commit()
+        click.echo(f"Compiled {counts['compiled']} notes, {counts['unchanged']} unchanged, {counts['missing']} missing.")
+
+    if sync:
+        try:
+            tree = scan_curriculum_tree(root_curriculum_path)
+            for message in tree['skipped']:
+                click.echo(message)
+            counts = sync_curriculum(tree['modules'])
+            rebuild_module_progress() # Refresh the materialized item counts
+            curriculum_structure_changed() # Refresh the path index and placement cache
+            db.session.commit()
+            click.echo(f"Sync complete: {counts['created']} created, {counts['updated']} updated, "
+                       f"{counts['deleted']} deleted, {counts['unchanged']} unchanged.")
+            if compile_notes_flag:
+                _compile_notes_phase()
+            click.echo("--- Curriculum automation complete! ---")
+        except Exception as e:
+            db.session.rollback()
+            click.echo(f"An unexpected error occurred during curriculum sync: {e}")
+            import traceback
+            traceback.print_exc()
+        return
+
     # --- Confirmation to clear existing data ---
     if not click.confirm("This will DELETE all existing Modules, Submodules, and ModuleItems. Continue?"):
         click.echo("Operation cancelled by user.")
         return
 
     try:
+        # Stage 1: scan the file system before touching the database
+        tree = scan_curriculum_tree(root_curriculum_path)
+        for message in tree['skipped']:
+            click.echo(message)
+
         # Clear existing data
         click.echo("Clearing existing curriculum data...")
+        db.session.query(ModuleProgress).delete()
+        db.session.query(CurriculumPath).delete()
         db.session.query(ModuleItem).delete()
         db.session.query(Submodule).delete()
         db.session.query(Module).delete()
-        db.session.commit()
-        click.echo("Existing curriculum data cleared.")
-    except Exception as e:
-        db.session.rollback()
-        click.echo(f"Error clearing existing data: {e}")
-        return
 
-    def _clean_name(name):
-        # Remove leading numbers and underscores, replace underscores with spaces, title case
-        name = re.sub(r'^\d+_', '', name)
-        return name.replace('_', ' ').replace('-', ' ').title()
+        # Stage 2: bulk insert the whole hierarchy
+        counts = import_curriculum(tree['modules'])
+        for spec in tree['modules']:
+            click.echo(f"+ Created Module: '{spec['title']}' from '{spec['slug']}'")
+        rebuild_module_progress() # Refresh the materialized item counts
+        curriculum_structure_changed() # Refresh the path index and placement cache
 
-    def _process_directory_recursive(current_dir_path, parent_module=None, parent_submodule=None):
-        current_level_items = sorted(os.listdir(current_dir_path))
-        
-        module_order_counter = 1
-        submodule_order_counter = 1
-        module_item_order_counter = 1
-
-        for item_name in current_level_items:
-            item_path = os.path.join(current_dir_path, item_name)
-            relative_item_path = os.path.relpath(item_path, app.root_path)
-
-            if os.path.isdir(item_path):
-                # Check if it's a module or submodule
-                if parent_module is None and parent_submodule is None: # Top-level directory -> Module
-                    module_title = _clean_name(item_name)
-                    click.echo(f"+ Creating Module: '{module_title}' from '{item_name}'")
-                    new_module = Module(title=module_title, slug=item_name, order=module_order_counter)
-                    db.session.add(new_module)
-                    db.session.flush() # Flush to get ID for recursion
-                    _process_directory_recursive(item_path, parent_module=new_module)
-                    module_order_counter += 1
-                else: # Subdirectory -> Submodule
-                    submodule_title = _clean_name(item_name)
-                    click.echo(f"  + Creating Submodule: '{submodule_title}' from '{item_name}'")
-                    new_submodule = Submodule(
-                        title=submodule_title,
-                        slug=item_name, # Add slug here
-                        order=submodule_order_counter,
-                        module_id=parent_module.id,
-                        parent_id=parent_submodule.id if parent_submodule else None
-                    )
-                    db.session.add(new_submodule)
-                    db.session.flush() # Flush to get ID for recursion
-                    _process_directory_recursive(item_path, parent_module=parent_module, parent_submodule=new_submodule)
-                    submodule_order_counter += 1
-            elif item_name.endswith('.md'):
-                # Only process markdown files as notes
-                if parent_submodule: # Notes must belong to a submodule
-                    note_title = _clean_name(os.path.splitext(item_name)[0])
-                    click.echo(f"    + Creating Note ModuleItem: '{note_title}' from '{item_name}'")
-                    new_module_item = ModuleItem(
-                        order=module_item_order_counter,
-                        submodule_id=parent_submodule.id,
-                        content_type='note',
-                        content_id=None, # No longer using Note model ID
-                        content_path=relative_item_path
-                    )
-                    db.session.add(new_module_item)
-                    module_item_order_counter += 1
-                else:
-                    click.echo(f"    ! Skipping markdown file '{item_name}' in module root (must be in a submodule).")
-            else:
-                click.echo(f"    - Skipping unknown file type: '{item_name}'")
-        
-        db.session.commit() # Commit changes for this level after processing all items
+        # Stage 3: commit once
+        db.session.commit()
+        click.echo(f"Imported {counts['modules']} modules, {counts['submodules']} submodules "
+                   f"and {counts['notes']} notes.")
 
-    try:
-        # Start recursive processing from the root curriculum path
-        _process_directory_recursive(root_curriculum_path)
-        db.session.commit() # Final commit for any remaining changes
+        if compile_notes_flag:
+            _compile_notes_phase()
         click.echo("--- Curriculum automation complete! ---")
     except Exception as e:
         db.session.rollback()
@@ -1078,6 +3708,7 @@ class User(db.Model, UserMixin):
     
     # --- ADD THIS RELATIONSHIP FOR COURSE PROGRESS ---
     progress_records = db.relationship('UserProgress', backref='user', lazy=True, cascade="all, delete-orphan")
+    module_progress = db.relationship('ModuleProgress', backref='user', lazy=True, cascade="all, delete-orphan")
     
     # --- ADD THIS RELATIONSHIP FOR CERTIFICATES ---
     certificates = db.relationship('Certificate', backref='user', lazy=True)
@@ -1107,11 +3738,18 @@ class Module(db.Model):
     order = db.Column(db.Integer, nullable=False, unique=True)
     is_published = db.Column(db.Boolean, nullable=False, default=False)
     
+    # Cached number of ModuleItems across all of this module's submodules.
+    # Maintained by register_module_items / release_module_items.
+    item_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    
     # Relationship to Submodules
     submodules = db.relationship('Submodule', back_populates='module', lazy='dynamic', cascade="all, delete-orphan", order_by='Submodule.order')
     
     # --- ADD THIS RELATIONSHIP FOR CERTIFICATES ---
     certificates = db.relationship('Certificate', backref='module', lazy=True, cascade="all, delete-orphan")
+    
+    # Materialized per-user progress counters for this module
+    progress_counters = db.relationship('ModuleProgress', backref='module', lazy=True, cascade="all, delete-orphan")
 
     def __repr__(self):
         return f"Module('{self.title}', Order: {self.order})"
@@ -1136,6 +3774,9 @@ class Submodule(db.Model):
     # Relationship to parent submodule
     parent = db.relationship('Submodule', remote_side=[id], backref=db.backref('children', lazy='dynamic'))
 
+    # Slug lookups and sibling listings always filter on (module, parent)
+    __table_args__ = (db.Index('ix_submodule_module_parent_slug', 'module_id', 'parent_id', 'slug'),)
+
     def __repr__(self):
         return f"Submodule('{self.title}', Order: {self.order})"
 
@@ -1153,6 +3794,13 @@ class ModuleItem(db.Model):
     content_id = db.Column(db.Integer, nullable=True) # Now nullable
     content_path = db.Column(db.String(255), nullable=True) # New column for file paths
     
+    __table_args__ = (
+        # Reverse lookup from a quiz/lab/session to all of its placements
+        db.Index('ix_module_item_content', 'content_type', 'content_id'),
+        # Ordered item listing for a submodule
+        db.Index('ix_module_item_submodule_order', 'submodule_id', 'order'),
+    )
+    
     # Relationships
     submodule = db.relationship('Submodule', back_populates='items')
     user_progress = db.relationship('UserProgress', backref='module_item', lazy=True, cascade="all, delete-orphan")
@@ -1173,8 +3821,7 @@ class ModuleItem(db.Model):
             # We need to return an object that has a 'title' attribute for display.
             if self.content_path:
                 # Extract title from filename
-                title = os.path.splitext(os.path.basename(self.content_path))[0].replace('_', ' ').title()
-                return {'title': title, 'path': self.content_path}
+                return {'title': note_title_from_path(self.content_path), 'path': self.content_path}
             return None
         return None
 
@@ -1194,6 +3841,79 @@ class UserProgress(db.Model):
     def __repr__(self):
         return f"UserProgress(User: {self.user_id}, Item: {self.module_item_id}, Status: '{self.status}')"
 
+class ModuleProgress(db.Model):
+    __tablename__ = 'module_progress'
+    id = db.Column(db.Integer, primary_key=True)
+    completed_items = db.Column(db.Integer, nullable=False, default=0)
+    last_updated = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    
+    # Foreign Keys
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    module_id = db.Column(db.Integer, db.ForeignKey('module.id'), nullable=False)
+    
+    # One materialized counter per user and module
+    __table_args__ = (db.UniqueConstraint('user_id', 'module_id', name='uq_user_module_progress'),)
+
+    def __repr__(self):
+        return f"ModuleProgress(User: {self.user_id}, Module: {self.module_id}, Completed: {self.completed_items})"
+
+class UserStats(db.Model):
+    __tablename__ = 'user_stats'
+    id = db.Column(db.Integer, primary_key=True)
+    # Distinct quizzes attempted / passed at least once
+    quizzes_taken = db.Column(db.Integer, nullable=False, default=0)
+    quizzes_passed = db.Column(db.Integer, nullable=False, default=0)
+    attempt_count = db.Column(db.Integer, nullable=False, default=0)
+    # JSON list of the newest attempts (see recent_attempt_entry), newest first
+    recent_attempts = db.Column(db.Text, nullable=False, default='[]')
+    last_updated = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+
+    # One materialized record per user, maintained by submit_result
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False, unique=True)
+
+    @property
+    def pass_rate(self):
+        return round(self.quizzes_passed / self.quizzes_taken * 100) if self.quizzes_taken else 0
+
+    @property
+    def recent(self):
+        return [
+            RecentAttempt(**dict(entry, timestamp=datetime.datetime.fromisoformat(entry['timestamp'])))
+            for entry in json.loads(self.recent_attempts or '[]')
+        ]
+
+    def __repr__(self):
+        return f"UserStats(User: {self.user_id}, Taken: {self.quizzes_taken}, Passed: {self.quizzes_passed})"
+
+class CurriculumPath(db.Model):
+    __tablename__ = 'curriculum_path'
+    id = db.Column(db.Integer, primary_key=True)
+    # Full slug path as used by /curriculum/<path>, e.g. 'module/submodule/file.md'
+    path = db.Column(db.String(1000), unique=True, nullable=False)
+    entity_type = db.Column(db.String(20), nullable=False) # 'module', 'submodule' or 'module_item'
+    entity_id = db.Column(db.Integer, nullable=False)
+    # Root module of the path, used to honour its publish state at lookup time
+    module_id = db.Column(db.Integer, nullable=False)
+
+    def __repr__(self):
+        return f"CurriculumPath('{self.path}' -> {self.entity_type} {self.entity_id})"
+
+class CompiledNote(db.Model):
+    __tablename__ = 'compiled_note'
+    id = db.Column(db.Integer, primary_key=True)
+    # Same relative path as ModuleItem.content_path
+    content_path = db.Column(db.String(255), unique=True, nullable=False)
+    content_hash = db.Column(db.String(64), nullable=False) # sha256 of the markdown source
+    file_mtime_ns = db.Column(db.BigInteger, nullable=False)
+    file_size = db.Column(db.Integer, nullable=False)
+    title = db.Column(db.String(255), nullable=False)
+    word_count = db.Column(db.Integer, nullable=False, default=0)
+    html = db.Column(db.Text, nullable=False)
+    compiled_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f"CompiledNote('{self.content_path}', Words: {self.word_count})"
+
 class Certificate(db.Model):
     __tablename__ = 'certificate'
     id = db.Column(db.Integer, primary_key=True)
@@ -1222,6 +3942,10 @@ class Quiz(db.Model):
     filename = db.Column(db.String(100), unique=True, nullable=False)
     category = db.Column(db.String(50), nullable=False, default='Quiz')
     passing_score = db.Column(db.Integer, nullable=False, default=18)
+    # Hash of the uploaded questions, options and passing score; changes whenever the content does
+    content_version = db.Column(db.String(64), nullable=True)
+    # Questions drawn per attempt when the quiz holds a larger pool; None means all questions
+    sample_size = db.Column(db.Integer, nullable=True)
     questions = db.relationship('Question', backref='quiz', lazy=True, cascade="all, delete-orphan")
     attempts = db.relationship('QuizAttempt', backref='quiz', lazy=True, cascade="all, delete-orphan")
 
@@ -1231,7 +3955,7 @@ class Quiz(db.Model):
 class Question(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     question_text = db.Column(db.String(500), nullable=False)
-    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False, index=True)
     options = db.relationship('Option', backref='question', lazy=True, cascade="all, delete-orphan")
 
     def __repr__(self):
@@ -1241,7 +3965,7 @@ class Option(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     option_text = db.Column(db.String(200), nullable=False)
     is_correct = db.Column(db.Boolean, nullable=False, default=False)
-    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('question.id'), nullable=False, index=True)
 
     def __repr__(self):
         return f"Option('{self.option_text}', Correct: {self.is_correct})"
@@ -1253,6 +3977,14 @@ class QuizAttempt(db.Model):
     timestamp = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     quiz_id = db.Column(db.Integer, db.ForeignKey('quiz.id'), nullable=False)
+    # Seed of the question sample drawn for this attempt (pooled quizzes only)
+    seed = db.Column(db.BigInteger, nullable=True)
+    # Dashboard history is always read per user, newest first; the stats update
+    # asks whether a user has attempted / passed a quiz before
+    __table_args__ = (
+        db.Index('ix_quiz_attempt_user_timestamp', 'user_id', 'timestamp'),
+        db.Index('ix_quiz_attempt_user_quiz', 'user_id', 'quiz_id', 'passed'),
+    )
 
     def __repr__(self):
         return f"Attempt(User: {self.user_id}, Quiz: {self.quiz_id}, Score: {self.score})"
@@ -1273,9 +4005,13 @@ class LabStep(db.Model):
     step_number = db.Column(db.Integer, nullable=False)
     description_text = db.Column(db.Text, nullable=False)
     type_text = db.Column(db.String(500), nullable=False)
-    match_text = db.Column(db.String(500), nullable=False)
+    # Accepted answers, one per line, compared according to match_mode (see LAB_MATCH_MODES)
+    match_text = db.Column(db.Text, nullable=False)
+    match_mode = db.Column(db.String(20), nullable=False, default='exact', server_default='exact')
     # Foreign Key to Lab
     lab_id = db.Column(db.Integer, db.ForeignKey('lab.id'), nullable=False)
+    # Step numbers are unique within a lab; also serves the step viewer lookup
+    __table_args__ = (db.UniqueConstraint('lab_id', 'step_number', name='uq_lab_step_number'),)
 
     def __repr__(self):
         return f"LabStep({self.step_number} for Lab ID: {self.lab_id})"
@@ -1321,6 +4057,28 @@ class Requirement(db.Model):
     def __repr__(self):
         return f"Requirement('{self.check_type}' for Session ID: {self.session_id})"
 
+class GradingJob(db.Model):
+    __tablename__ = 'grading_job'
+    id = db.Column(db.Integer, primary_key=True)
+    status = db.Column(db.String(20), nullable=False, default='queued') # queued, running, done, failed
+    submission = db.Column(db.Text, nullable=False)
+    results = db.Column(db.Text, nullable=True) # JSON list, as returned by HtmlValidationPlan.run
+    is_complete = db.Column(db.Boolean, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, nullable=False, default=datetime.datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Foreign Keys
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    session_id = db.Column(db.Integer, db.ForeignKey('practical_session.id', ondelete='CASCADE'), nullable=False)
+
+    # Workers claim the oldest queued job first
+    __table_args__ = (db.Index('ix_grading_job_status_id', 'status', 'id'),)
+
+    def __repr__(self):
+        return f"GradingJob({self.id}, Session: {self.session_id}, Status: {self.status})"
+
 
 
 # ===================================
@@ -1437,23 +4195,16 @@ def course_dashboard():
     user_progress_map = get_user_progress_map(current_user.id)
     
     # 3. Calculate progress for each module and the overall course progress
+    #    from the materialized per-module counters (one indexed read per user).
+    module_progress_counts = get_module_progress_counts(current_user.id)
     module_progress_data = {}
     total_items_in_course = 0
     completed_items_in_course = 0
 
     for module in modules:
-        # Calculate progress for this specific module
-        progress_percent = calculate_module_progress(module, user_progress_map)
-        module_progress_data[module.id] = progress_percent
-        
-        # Add to overall course totals. We need to query the item count here.
-        # This is a bit more expensive but necessary for an accurate overall bar.
-        module_item_count = ModuleItem.query.join(Submodule).filter(Submodule.module_id == module.id).count()
-        total_items_in_course += module_item_count
-        
-        # Calculate completed items for this module based on the percentage
-        completed_count_for_module = round(module_item_count * (progress_percent / 100))
-        completed_items_in_course += completed_count_for_module
+        module_progress_data[module.id] = calculate_module_progress(module, module_progress_counts)
+        total_items_in_course += module.item_count
+        completed_items_in_course += min(module_progress_counts.get(module.id, 0), module.item_count)
 
     # Calculate final overall course progress
     overall_progress = 0
@@ -1465,7 +4216,7 @@ def course_dashboard():
 
     return render_template(
         'course.html', 
-        modules=modules,
+        modules=load_course_tree(modules),
         module_progress_data=module_progress_data,
         user_progress_map=user_progress_map,
         overall_progress=overall_progress,
@@ -1508,7 +4259,7 @@ def inject_now():
 
 @app.template_filter('markdown')
 def markdown_filter(s):
-    return markdown.markdown(s, extensions=['fenced_code', 'tables'])
+    return render_markdown(s)
 
 # app.py
 
@@ -1537,7 +4288,7 @@ def start_lab(lab_id):
 def lab_step_viewer(lab_id, step_number):
     lab = Lab.query.get_or_404(lab_id)
     step = LabStep.query.filter_by(lab_id=lab.id, step_number=step_number).first_or_404()
-    total_steps = len(lab.steps)
+    total_steps = lab_steps.step_count(lab.id)
     return render_template('lab_viewer.html', lab=lab, step=step, total_steps=total_steps)
 
 # app.py -> ROUTES section
@@ -1568,29 +4319,29 @@ def lab_complete(lab_id):
 @login_required
 def quiz_viewer(quiz_id):
     # This route is now simpler. We just fetch the quiz object.
-    # The relationships in our models will allow Jinja to access questions and options.
     quiz = Quiz.query.get_or_404(quiz_id)
 
-    # Find the parent module and submodule
-    module_item = ModuleItem.query.filter_by(content_type='quiz', content_id=quiz.id).first()
+    # Find the parent module and submodule (first placement of this quiz)
+    placements = content_placements.get('quiz', quiz.id)
     module_id = None
     submodule_id = None
-    if module_item:
-        submodule_id = module_item.submodule_id
-        if module_item.submodule:
-            module_id = module_item.submodule.module_id
-
-    # We still need the questions with answers for the review part later.
-    questions_for_review = []
-    for q in quiz.questions:
-        options = [{'id': opt.id, 'text': opt.option_text, 'is_correct': opt.is_correct} for opt in q.options]
-        questions_for_review.append({'id': q.id, 'text': q.question_text, 'options': options})
-    questions_with_answers_json = json.dumps(questions_for_review)
+    if placements:
+        submodule_id = placements[0].submodule_id
+        module_id = placements[0].module_id
+
+    # Questions, options and the review JSON are pre-built once per quiz version.
+    # Pooled quizzes show the sample drawn for the learner's open attempt instead.
+    if quiz.sample_size:
+        question_ids = question_pools.sample(quiz.id, quiz.content_version, quiz.sample_size,
+                                             get_quiz_attempt_seed(quiz.id, create=True))
+        payload = build_quiz_payload(quiz.id, quiz.content_version, question_ids)
+    else:
+        payload = quiz_payloads.get(quiz)
 
     return render_template(
         'quiz_viewer.html', 
         quiz=quiz,
-        questions_with_answers_json=questions_with_answers_json,
+        payload=payload,
         module_id=module_id,
         submodule_id=submodule_id
     )
@@ -1604,30 +4355,19 @@ def dashboard():
     if current_user.role == 'admin':
         return redirect(url_for('admin_dashboard'))
 
-    # Calculate user statistics for their quiz performance
-    attempts = QuizAttempt.query.filter_by(user_id=current_user.id).all()
-    
-    # Calculate stats based on UNIQUE quizzes the user has interacted with
-    quizzes_taken = len(set(a.quiz_id for a in attempts))
-    quizzes_passed = len(set(a.quiz_id for a in attempts if a.passed))
-    
-    pass_rate = 0
-    # Avoid division by zero for new users
-    if quizzes_taken > 0:
-        pass_rate = round((quizzes_passed / quizzes_taken) * 100)
-        
-    # Get the 3 most recent attempts for the activity feed
-    recent_attempts = QuizAttempt.query.filter_by(user_id=current_user.id).order_by(QuizAttempt.timestamp.desc()).limit(3).all()
-
-    # Get all certificates for the user
-    certificates = Certificate.query.filter_by(user_id=current_user.id).order_by(Certificate.completion_date.desc()).all()
-
+    # Quiz statistics come from the learner's materialized UserStats row
+    user_stats = UserStats.query.filter_by(user_id=current_user.id).first()
     stats = {
-        'quizzes_taken': quizzes_taken,
-        'quizzes_passed': quizzes_passed,
-        'pass_rate': pass_rate,
-        'recent_attempts': recent_attempts
+        'quizzes_taken': user_stats.quizzes_taken if user_stats else 0,
+        'quizzes_passed': user_stats.quizzes_passed if user_stats else 0,
+        'pass_rate': user_stats.pass_rate if user_stats else 0,
+        'recent_attempts': user_stats.recent if user_stats else []
     }
+
+    # Get all certificates for the user, with their module titles in the same query
+    certificates = Certificate.query.filter_by(user_id=current_user.id) \
+        .options(db.joinedload(Certificate.module)) \
+        .order_by(Certificate.completion_date.desc()).all()
     
     return render_template('dashboard.html', stats=stats, certificates=certificates)    
     
@@ -1742,35 +4482,26 @@ def admin_quizzes():
                 flash(f"A quiz with the filename '{filename}' already exists.", 'danger')
                 return redirect(request.url)
 
-            markdown_text = file.stream.read().decode("utf-8")
-            parsed_data = parse_quiz_markdown(markdown_text)
+            # Parse straight from the upload stream; every problem is reported at once
+            parsed_data, parse_errors = parse_quiz_lines(file.stream)
 
-            if parsed_data is None:
-                flash('Failed to parse the markdown file. Please check its format.', 'danger')
+            if parse_errors:
+                flash(f"Failed to parse the markdown file. {format_quiz_parse_errors(parse_errors)}", 'danger')
                 return redirect(request.url)
 
+            # Files with more questions than the category asks for become pools sampled per attempt
             expected_count = QUIZ_CATEGORIES[category]['questions']
             actual_count = len(parsed_data)
-            if actual_count != expected_count:
-                flash(f"Validation Error: The selected category '{QUIZ_CATEGORIES[category]['name']}' requires exactly {expected_count} questions, but the file contained {actual_count}.", 'danger')
+            if actual_count < expected_count:
+                flash(f"Validation Error: The selected category '{QUIZ_CATEGORIES[category]['name']}' requires at least {expected_count} questions, but the file contained {actual_count}.", 'danger')
                 return redirect(request.url)
             
             try:
-                quiz_title = os.path.splitext(filename)[0].replace('_', ' ').title()
-                selected_category_data = QUIZ_CATEGORIES[category]
-                new_quiz = Quiz(title=quiz_title, filename=filename, category=selected_category_data['name'], passing_score=selected_category_data['passing_score'])
-                db.session.add(new_quiz)
-                
-                for q_data in parsed_data:
-                    new_question = Question(question_text=q_data['question_text'], quiz=new_quiz)
-                    db.session.add(new_question)
-                    for i, opt_text in enumerate(q_data['options']):
-                        is_correct = (i == q_data['correct_index'])
-                        new_option = Option(option_text=opt_text, is_correct=is_correct, question=new_question)
-                        db.session.add(new_option)
-                
+                new_quiz = create_quiz(filename, parsed_data, category)
                 db.session.commit()
-                flash(f"Successfully uploaded and created '{quiz_title}'.", 'success')
+                # Compile the answer key and page payload now so the first learner does not pay for them
+                warm_quiz_caches(new_quiz)
+                flash(f"Successfully uploaded and created '{new_quiz.title}'.", 'success')
             except Exception as e:
                 db.session.rollback()
                 flash(f"A database error occurred: {e}", "danger")
@@ -1782,7 +4513,10 @@ def admin_quizzes():
 
     # Logic for GET request
     quizzes = Quiz.query.order_by(Quiz.id.desc()).all()
-    return render_template('admin_quiz_management.html', quizzes=quizzes, categories=QUIZ_CATEGORIES)
+    # Count questions with one grouped query instead of loading every question of every pool
+    question_counts = dict(db.session.query(Question.quiz_id, func.count(Question.id)).group_by(Question.quiz_id).all())
+    return render_template('admin_quiz_management.html', quizzes=quizzes, categories=QUIZ_CATEGORIES,
+                           question_counts=question_counts)
     
 # app.py
 
@@ -1824,22 +4558,9 @@ def admin_labs():
             
             # If parsing succeeds, add to the database
             try:
-                lab_title = os.path.splitext(filename)[0].replace('_', ' ').title()
-                new_lab = Lab(title=lab_title, filename=filename)
-                db.session.add(new_lab)
-                
-                for step_data in parsed_data:
-                    new_step = LabStep(
-                        step_number=step_data['step_number'],
-                        description_text=step_data['description_text'],
-                        type_text=step_data['type_text'],
-                        match_text=step_data['match_text'],
-                        lab=new_lab
-                    )
-                    db.session.add(new_step)
-                
+                new_lab = create_lab(filename, parsed_data)
                 db.session.commit()
-                flash(f"Successfully uploaded and created Lab: '{lab_title}'.", 'success')
+                flash(f"Successfully uploaded and created Lab: '{new_lab.title}'.", 'success')
             except Exception as e:
                 db.session.rollback()
                 flash(f"A database error occurred: {e}", "danger")
@@ -1867,6 +4588,44 @@ def admin_sessions():
 
 
 
+@app.route("/admin/content/import", methods=['POST'])
+@login_required
+def admin_import_content():
+    if current_user.role != 'admin':
+        flash('You do not have permission to access this page.', 'danger')
+        return redirect(url_for('dashboard'))
+
+    file = request.files.get('archive')
+    if not file or file.filename == '':
+        flash('No file selected.', 'danger')
+        return redirect(url_for('admin_quizzes'))
+    if not file.filename.lower().endswith('.zip'):
+        flash('Invalid file type. Please upload a .zip archive of quiz, lab and session files.', 'danger')
+        return redirect(url_for('admin_quizzes'))
+
+    category = request.form.get('category') or None
+    if category and category not in QUIZ_CATEGORIES:
+        flash('Invalid category selected.', 'danger')
+        return redirect(url_for('admin_quizzes'))
+
+    try:
+        files = read_content_files(file.stream)
+    except zipfile.BadZipFile:
+        flash('The uploaded file is not a valid zip archive.', 'danger')
+        return redirect(url_for('admin_quizzes'))
+
+    reports = import_content_files(files, quiz_category=category)
+    if request.accept_mimetypes.best == 'application/json':
+        return jsonify({'status': 'success', 'results': reports})
+
+    failed = [report for report in reports if report['status'] != 'success']
+    flash(f"Imported {len(reports) - len(failed)} of {len(reports)} files.", 'warning' if failed else 'success')
+    for report in failed[:20]:
+        flash(f"{report['name']}: {report['message']}", 'danger')
+    if len(failed) > 20:
+        flash(f"... and {len(failed) - 20} more files failed.", 'danger')
+    return redirect(url_for('admin_quizzes'))
+
 @app.route("/admin/browse/", defaults={'path_segments': ''})
 @app.route("/admin/browse/<path:path_segments>")
 @login_required
@@ -1948,6 +4707,7 @@ def admin_course_builder():
             
             new_module = Module(title=title, order=new_order, is_published=is_published)
             db.session.add(new_module)
+            curriculum_structure_changed()
             db.session.commit()
             flash(f"Module '{title}' created successfully.", 'success')
         return redirect(url_for('admin_course_builder'))
@@ -1955,12 +4715,13 @@ def admin_course_builder():
     # GET Request: Display all modules
     modules = Module.query.order_by(Module.order.asc()).all()
     user_progress_map = get_user_progress_map(current_user.id)
+    module_progress_counts = get_module_progress_counts(current_user.id)
     module_progress_data = {}
     for module in modules:
-        progress_percent = calculate_module_progress(module, user_progress_map)
+        progress_percent = calculate_module_progress(module, module_progress_counts)
         module_progress_data[module.id] = progress_percent
 
-    return render_template('admin_course_management.html', modules=modules, module_progress_data=module_progress_data, user_progress_map=user_progress_map)
+    return render_template('admin_course_management.html', modules=load_course_tree(modules), module_progress_data=module_progress_data, user_progress_map=user_progress_map)
 
 @app.route("/admin/module/<int:module_id>/delete", methods=['POST'])
 @login_required
@@ -1988,7 +4749,8 @@ def delete_module(module_id):
         subsequent_modules = Module.query.filter(Module.order > deleted_module_order).order_by(Module.order.asc()).all()
         for mod in subsequent_modules:
             mod.order -= 1
-            
+
+        curriculum_structure_changed()
         db.session.commit()
         return jsonify({'status': 'success', 'message': f'Module \'{module_to_delete.title}\' deleted.'})
     except Exception as e:
@@ -2050,6 +4812,7 @@ def admin_manage_submodules(module_id):
             
             new_submodule = Submodule(title=title, order=new_order, module_id=module.id)
             db.session.add(new_submodule)
+            curriculum_structure_changed()
             db.session.commit()
             flash(f"Submodule '{title}' created successfully.", 'success')
         return redirect(url_for('admin_manage_submodules', module_id=module.id))
@@ -2124,6 +4887,8 @@ def add_module_item(submodule_id):
             )
         
         db.session.add(new_module_item)
+        register_module_items(submodule.module_id)
+        curriculum_structure_changed()
         db.session.commit()
         flash(f"Module item '{content_type}' added successfully.", 'success')
     except Exception as e:
@@ -2142,7 +4907,9 @@ def delete_module_item(module_item_id):
     submodule_id = module_item_to_delete.submodule_id
 
     try:
+        release_module_items([module_item_to_delete.id])
         db.session.delete(module_item_to_delete)
+        curriculum_structure_changed()
         db.session.commit()
         return jsonify({'status': 'success', 'message': 'Module item deleted successfully.'})
     except Exception as e:
@@ -2166,8 +4933,10 @@ def delete_submodule(submodule_id):
         ).all()
         for sub in subsequent_submodules:
             sub.order -= 1
-            
+
+        release_module_items(item.id for item in submodule_to_delete.items)
         db.session.delete(submodule_to_delete)
+        curriculum_structure_changed()
         db.session.commit()
         return jsonify({'status': 'success', 'message': f'Submodule \'{submodule_to_delete.title}\' deleted.'})
     except Exception as e:
@@ -2257,8 +5026,10 @@ def unlink_content_item(item_id):
         ).all()
         for item in subsequent_items:
             item.order -= 1
-            
+
+        release_module_items([item_to_delete.id])
         db.session.delete(item_to_delete)
+        curriculum_structure_changed()
         db.session.commit()
         return jsonify({'status': 'success', 'message': 'Content item unlinked from submodule.'})
     except Exception as e:
@@ -2283,10 +5054,29 @@ def delete_content(content_type, content_id):
         else:
             return jsonify({'status': 'error', 'message': 'Invalid content type'}), 400
 
+        affected_users = []
+        if content_type == 'quiz':
+            quiz_answer_keys.invalidate(content_id)
+            quiz_payloads.invalidate(content_id)
+            question_pools.invalidate(content_id)
+            affected_users = [row.user_id for row in db.session.query(QuizAttempt.user_id).filter_by(quiz_id=content_id).distinct()]
+        elif content_type == 'lab':
+            lab_steps.invalidate(content_id)
+        elif content_type == 'session':
+            session_validation_plans.invalidate(content_id)
+            GradingJob.query.filter_by(session_id=content_id).delete(synchronize_session=False)
+
         # Also delete all ModuleItems that point to this content
-        ModuleItem.query.filter_by(content_type=content_type, content_id=content_id).delete()
+        linked_items = ModuleItem.query.filter_by(content_type=content_type, content_id=content_id)
+        release_module_items(item.id for item in linked_items.all())
+        linked_items.delete()
 
         db.session.delete(content_to_delete)
+        if affected_users:
+            # The quiz's attempts are deleted with it; recount the stats of whoever took it
+            db.session.flush()
+            rebuild_user_stats(affected_users)
+        curriculum_structure_changed()
         db.session.commit()
         return jsonify({'status': 'success', 'message': f'{content_type.capitalize()} deleted successfully.'})
     except Exception as e:
@@ -2357,6 +5147,7 @@ def create_module():
         new_module = Module(title=title, order=new_order, is_published=False)
         db.session.add(new_module)
         print(f"DEBUG: Added new module to session: {new_module}")
+        curriculum_structure_changed()
         db.session.commit()
         print(f"DEBUG: Module \"{title}\" created successfully with ID: {new_module.id} and committed to DB.")
         return jsonify({'status': 'success', 'message': 'Module created', 'module_id': new_module.id})
@@ -2395,7 +5186,8 @@ def duplicate_module(module_id):
         new_module = Module(
             title=original_module.title + ' (Copy)',
             order=new_order,
-            is_published=False
+            is_published=False,
+            item_count=0
         )
         db.session.add(new_module)
         db.session.flush()
@@ -2418,7 +5210,9 @@ def duplicate_module(module_id):
                     content_id=item.content_id
                 )
                 db.session.add(new_item)
+                new_module.item_count += 1
         
+        curriculum_structure_changed()
         db.session.commit()
         return jsonify({'status': 'success', 'message': 'Module duplicated'})
     except Exception as e:
@@ -2455,6 +5249,7 @@ def create_submodule():
             new_submodule = Submodule(title=title, order=new_order, module_id=module_id)
 
         db.session.add(new_submodule)
+        curriculum_structure_changed()
         db.session.commit()
 
         return jsonify({'status': 'success', 'message': 'Submodule created', 'submodule_id': new_submodule.id})
@@ -2493,7 +5288,9 @@ def duplicate_submodule(submodule_id):
                 content_id=item.content_id
             )
             db.session.add(new_item)
+        register_module_items(original_submodule.module_id, original_submodule.items.count())
         
+        curriculum_structure_changed()
         db.session.commit()
         return jsonify({'status': 'success', 'message': 'Submodule duplicated'})
     except Exception as e:
@@ -2544,6 +5341,8 @@ def create_content_item():
             content_id=content_id
         )
         db.session.add(new_item)
+        register_module_items(submodule.module_id)
+        curriculum_structure_changed()
         db.session.commit()
         
         return jsonify({'status': 'success', 'message': 'Content item created', 'item_id': new_item.id})
@@ -2794,7 +5593,6 @@ def process_lab(filepath):
     
     # 3. Prepare to add to the database
     filename = os.path.basename(filepath)
-    lab_title = os.path.splitext(filename)[0].replace('_', ' ').title()
 
     # Check for duplicate filename to prevent errors
     if Lab.query.filter_by(filename=filename).first():
@@ -2802,25 +5600,10 @@ def process_lab(filepath):
         return
     
     try:
-        # Create the parent Lab object
-        new_lab = Lab(title=lab_title, filename=filename)
-        db.session.add(new_lab)
-        print(f"--> Creating Lab: '{lab_title}'")
-
-        # Loop through the parsed data and create all associated LabStep objects
-        for step_data in parsed_data:
-            new_step = LabStep(
-                step_number=step_data['step_number'],
-                description_text=step_data['description_text'],
-                type_text=step_data['type_text'],
-                match_text=step_data['match_text'],
-                lab=new_lab  # Associate this step with the parent lab
-            )
-            db.session.add(new_step)
-        
-        # Commit the entire transaction to the database
+        # Create the Lab and all of its steps in one transaction
+        new_lab = create_lab(filename, parsed_data)
         db.session.commit()
-        print(f"SUCCESS! Lab '{lab_title}' has been added to the database.")
+        print(f"SUCCESS! Lab '{new_lab.title}' has been added to the database.")
 
     except Exception as e:
         # If any database error occurs, roll back all changes
@@ -2828,6 +5611,205 @@ def process_lab(filepath):
         print(f"DATABASE ERROR: {e}")
         print("Transaction has been rolled back. No changes were saved.")
 
+@app.cli.command("import-content")
+@click.argument("path")
+@click.option("--category", type=click.Choice(list(QUIZ_CATEGORIES)), default=None,
+              help="Quiz category for every quiz file. By default it is chosen by question count.")
+@click.option("--workers", type=int, default=None, help="Number of parser processes.")
+def import_content(path, category, workers):
+    """Bulk-imports quiz, lab and session files from a directory or a .zip archive."""
+    if not os.path.exists(path):
+        print(f"Error: '{path}' does not exist.")
+        return
+    try:
+        files = read_content_files(path)
+    except zipfile.BadZipFile:
+        print(f"Error: '{path}' is neither a directory nor a zip archive.")
+        return
+
+    print(f"--> Importing {len(files)} files from '{path}'")
+    reports = import_content_files(files, quiz_category=category, max_workers=workers)
+    for report in reports:
+        marker = 'OK ' if report['status'] == 'success' else 'ERR'
+        print(f"[{marker}] {report['name']}: {report['message']}")
+    imported = sum(1 for report in reports if report['status'] == 'success')
+    print(f"Imported {imported} of {len(reports)} files.")
+
+@app.cli.command("rebuild-progress")
+def rebuild_progress():
+    """Recomputes the materialized module item counts and per-user progress counters."""
+    print("Rebuilding module progress counters...")
+    try:
+        rebuild_module_progress()
+        db.session.commit()
+        print("Module progress counters rebuilt.")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error rebuilding module progress: {e}")
+
+@app.cli.command("rebuild-stats")
+def rebuild_stats():
+    """Recomputes every learner's materialized dashboard statistics from their quiz attempts."""
+    print("Rebuilding user statistics...")
+    try:
+        rebuild_user_stats()
+        db.session.commit()
+        print("User statistics rebuilt.")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error rebuilding user statistics: {e}")
+
+@app.cli.command("rebuild-paths")
+def rebuild_paths():
+    """Rebuilds the slug path index used to resolve /curriculum/ deep links."""
+    print("Rebuilding curriculum path index...")
+    try:
+        rebuild_curriculum_paths()
+        db.session.commit()
+        print(f"Indexed {CurriculumPath.query.count()} curriculum paths.")
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error rebuilding curriculum paths: {e}")
+
+# Hot lookups that must be served by an index; checked by tests/test_query_plans.py and `flask check-indexes`
+HOT_QUERY_PLANS = [
+    ('user_progress by user', 'SELECT module_item_id, status FROM user_progress WHERE user_id = :id'),
+    ('user_progress by user and item', 'SELECT id FROM user_progress WHERE user_id = :id AND module_item_id = :id'),
+    ('module_progress by user', 'SELECT module_id, completed_items FROM module_progress WHERE user_id = :id'),
+    ('lab_progress by user and lab', 'SELECT current_step_number FROM lab_progress WHERE user_id = :id AND lab_id = :id'),
+    ('lab_step by lab and number', 'SELECT id FROM lab_step WHERE lab_id = :id AND step_number = :id'),
+    ('quiz_attempt history', 'SELECT id, score FROM quiz_attempt WHERE user_id = :id ORDER BY timestamp DESC LIMIT 3'),
+    ('quiz_attempt by user and quiz', 'SELECT passed FROM quiz_attempt WHERE user_id = :id AND quiz_id = :id ORDER BY passed DESC LIMIT 1'),
+    ('user_stats by user', 'SELECT quizzes_taken, recent_attempts FROM user_stats WHERE user_id = :id'),
+    ('submodule by parent and slug', 'SELECT id FROM submodule WHERE module_id = :id AND parent_id = :id AND slug = :slug'),
+    ('module_item listing', 'SELECT id FROM module_item WHERE submodule_id = :id ORDER BY "order"'),
+    ('module_item placements', 'SELECT id FROM module_item WHERE content_type = :slug AND content_id = :id'),
+    ('certificate by user and module', 'SELECT id FROM certificate WHERE user_id = :id AND module_id = :id'),
+    ('curriculum_path by path', 'SELECT entity_type, entity_id FROM curriculum_path WHERE path = :slug'),
+    ('question pool ids', 'SELECT id FROM question WHERE quiz_id = :id ORDER BY id'),
+    ('options of a question', 'SELECT id, is_correct FROM option WHERE question_id = :id'),
+]
+
+def explain_uses_index(sql, connection=None):
+    """Returns (uses_index, plan_text) for a hot query on the app's database, or on `connection` if given."""
+    params = {'id': 1, 'slug': 'x'}
+    executor = connection if connection is not None else db.session
+    dialect = connection.dialect if connection is not None else db.engine.dialect
+    if dialect.name == 'sqlite':
+        rows = executor.execute(text(f"EXPLAIN QUERY PLAN {sql}"), params).fetchall()
+        plan = [row[-1] for row in rows]
+        # Any full table scan without an index means the lookup is not covered
+        uses_index = all('USING' in step for step in plan if step.startswith(('SCAN', 'SEARCH')))
+    else:
+        # Small tables make the planner prefer sequential scans; disable them so the
+        # check reports whether an index is usable at all
+        executor.execute(text("SET LOCAL enable_seqscan = off"))
+        rows = executor.execute(text(f"EXPLAIN {sql}"), params).fetchall()
+        plan = [row[0] for row in rows]
+        uses_index = any('Index' in step for step in plan)
+    return uses_index, ' | '.join(plan)
+
+@app.cli.command("check-indexes")
+def check_indexes():
+    """Checks that every hot lookup query is served by an index."""
+    failures = 0
+    try:
+        for name, sql in HOT_QUERY_PLANS:
+            try:
+                uses_index, plan = explain_uses_index(sql)
+            except Exception as e:
+                db.session.rollback()
+                uses_index, plan = False, f"error: {e.__class__.__name__}"
+            print(f"[{'OK' if uses_index else 'MISSING'}] {name}: {plan}")
+            failures += 0 if uses_index else 1
+    finally:
+        db.session.rollback()
+    if failures:
+        print(f"{failures} hot queries are not using an index. Run 'flask db upgrade'.")
+        raise SystemExit(1)
+    print("All hot queries use an index.")
+
+@app.cli.command("benchmark-html-parsers")
+@click.argument("corpus")
+@click.option("--session", "session_ids", type=int, multiple=True,
+              help="Practical session whose requirements are checked. Repeatable; defaults to every session.")
+@click.option("--repeat", type=int, default=3, help="Timed runs per backend.")
+def benchmark_html_parsers(corpus, session_ids, repeat):
+    """Times every installed HTML parser backend on a corpus of submissions and compares their check results."""
+    if os.path.isdir(corpus):
+        paths = sorted(os.path.join(corpus, name) for name in os.listdir(corpus) if name.lower().endswith(('.html', '.htm')))
+    else:
+        paths = [corpus]
+    submissions = []
+    for path in paths:
+        with open(path, encoding='utf-8', errors='replace') as f:
+            submissions.append((os.path.basename(path), f.read()))
+    if not submissions:
+        print(f"Error: no .html files found in '{corpus}'.")
+        return
+
+    sessions = PracticalSession.query.filter(PracticalSession.id.in_(session_ids)) if session_ids else PracticalSession.query
+    plans = [(session.title, HtmlValidationPlan(session.requirements)) for session in sessions.order_by(PracticalSession.id.asc())]
+    if not plans:
+        print("Error: no practical sessions to validate against.")
+        return
+
+    backends = [backend for backend in HTML_PARSER_BACKENDS.values() if backend.available()]
+    for backend in HTML_PARSER_BACKENDS.values():
+        if not backend.available():
+            print(f"[SKIP] {backend.name}: '{backend.requires}' is not installed.")
+
+    results, timings = {}, {}
+    for backend in backends:
+        best = None
+        for _ in range(max(1, repeat)):
+            started = time.perf_counter()
+            results[backend.name] = [plan.run(markup, parser=backend) for _, markup in submissions for _, plan in plans]
+            elapsed = time.perf_counter() - started
+            best = elapsed if best is None else min(best, elapsed)
+        timings[backend.name] = best
+
+    reference = backends[0].name
+    for backend in backends:
+        speedup = timings[reference] / timings[backend.name] if timings[backend.name] else float('inf')
+        print(f"{backend.name:12} {timings[backend.name] * 1000:9.1f} ms  ({speedup:.1f}x {reference})")
+
+    mismatches = 0
+    runs = [(name, title) for name, _ in submissions for title, _ in plans]
+    for backend in backends[1:]:
+        for (name, title), expected, actual in zip(runs, results[reference], results[backend.name]):
+            for expected_check, actual_check in zip(expected, actual):
+                if expected_check != actual_check:
+                    mismatches += 1
+                    print(f"[DIFF] {backend.name} on {name} / {title}: '{expected_check['description']}'\n"
+                          f"       {reference}: {expected_check['message']}\n"
+                          f"       {backend.name}: {actual_check['message']}")
+    print(f"{len(submissions)} submissions x {len(plans)} sessions checked with {len(backends)} backends.")
+    if mismatches:
+        print(f"{mismatches} check results differ from {reference}.")
+        raise SystemExit(1)
+    print("All backends produce the same check results.")
+
+@app.cli.command("grading-worker")
+@click.option("--threads", type=int, default=None, help="Jobs graded at once. Defaults to GRADING_WORKERS.")
+def grading_worker(threads):
+    """Runs grading workers for queued session submissions until interrupted."""
+    pool = GradingWorkerPool(size=threads or app.config['GRADING_WORKERS'] or 1,
+                             poll_interval=app.config['GRADING_POLL_INTERVAL'])
+    print(f"Grading with {pool.size} worker threads. Press Ctrl+C to stop.")
+    stop = threading.Event()
+    workers = [threading.Thread(target=pool.work, args=(stop,), daemon=True) for _ in range(pool.size)]
+    for worker in workers:
+        worker.start()
+    try:
+        while any(worker.is_alive() for worker in workers):
+            time.sleep(1)
+    except KeyboardInterrupt:
+        stop.set()
+        print("Stopping after the current jobs...")
+        for worker in workers:
+            worker.join()
+
 @app.cli.command("promote")
 @click.argument("username")
 def promote(username):
@@ -0,0 +1,220 @@
+// Sandboxed code runner used by CodeRunnerPool in app.py.
+//
+// Runs exactly one submission: reads one JSON job from stdin, writes one JSON
+// result to stdout and exits. The app starts a fresh process for every
+// submission under OS limits on CPU time and memory, so nothing a submission
+// does can outlive it or reach another learner's run; `vm` on its own is not
+// a security boundary.
+//
+// Inside the process the code runs in a vm context with no timers, I/O or
+// built-in modules. The context's global has a null prototype and no host
+// object is ever placed in it: console, require and the promise tracker are
+// created inside the context before the submission runs, and only primitives
+// (strings, booleans) are read back out of it.
+'use strict';
+
+const vm = require('vm');
+
+const MAX_OUTPUT_LINES = 200;
+const MAX_OUTPUT_CHARS = 64 * 1024;
+
+// Evaluated in the fresh context before any submitted code, so the built-ins it
+// captures are still the originals. Its completion value is only seen by this
+// script; the submission can reach console and require, nothing else.
+const BOOTSTRAP = `(function (maxLines, maxChars) {
+    'use strict';
+    const apply = Reflect.apply;
+    const then = Promise.prototype.then;
+    const resolve = Promise.resolve;
+    const NativePromise = Promise;
+    const stringify = JSON.stringify;
+    const toText = String;
+    const lines = [];
+    let chars = 0;
+    const factories = Object.create(null);
+    const modules = Object.create(null);
+
+    function describe(value) {
+        try {
+            if (typeof value === 'string') return value;
+            if (value instanceof Error) return toText(value.name) + ': ' + toText(value.message);
+            return toText(value);
+        } catch (e) {
+            return '[unprintable value]';
+        }
+    }
+
+    function log(...args) {
+        if (lines.length >= maxLines || chars >= maxChars) return;
+        let line = '';
+        for (let i = 0; i < args.length; i++) line += (i ? ' ' : '') + describe(args[i]);
+        chars += line.length;
+        lines[lines.length] = line;
+    }
+
+    function normalize(name) {
+        return toText(name).replace(/^\\.\\//, '').replace(/^\\//, '');
+    }
+
+    function require(name) {
+        let key = normalize(name);
+        if (!(key in factories) && (key + '.js') in factories) key += '.js';
+        if (!(key in factories)) throw new Error("Cannot find module '" + name + "'");
+        if (key in modules) return modules[key].exports;
+        const module = { exports: {} };
+        modules[key] = module;
+        factories[key](module.exports, require, module, key, '.');
+        return module.exports;
+    }
+
+    globalThis.console = { log, info: log, warn: log, error: log, debug: log };
+    globalThis.require = require;
+
+    return {
+        register(key, factory) { factories[key] = factory; },
+        // Settles through the original Promise machinery, whatever the submission did to Promise
+        track(value) {
+            const state = { settled: false, ok: false, value: undefined };
+            apply(then, apply(resolve, NativePromise, [value]), [
+                result => { state.settled = true; state.ok = true; state.value = result; },
+                error => { state.settled = true; state.ok = false; state.value = error; },
+            ]);
+            return state;
+        },
+        output() { return stringify(lines); },
+    };
+})`;
+
+function describe(value) {
+    // `value` may come from the context; only primitives are kept
+    try {
+        if (typeof value === 'string') return value;
+        if (value instanceof Error) return `${value.name}: ${value.message}`;
+        if (value && typeof value.message === 'string' && typeof value.name === 'string') {
+            return `${String(value.name)}: ${String(value.message)}`;
+        }
+        return String(value);
+    } catch (e) {
+        return '[unprintable value]';
+    }
+}
+
+function createSandbox(files, timeoutMs, modules) {
+    const context = vm.createContext(Object.create(null), {
+        codeGeneration: { strings: false, wasm: false },
+        microtaskMode: 'afterEvaluate',
+    });
+    const bootstrap = new vm.Script(BOOTSTRAP, { filename: 'bootstrap.js' }).runInContext(context, { timeout: timeoutMs });
+    const handle = bootstrap(MAX_OUTPUT_LINES, MAX_OUTPUT_CHARS);
+    for (const name of modules ? Object.keys(files) : []) {
+        const key = String(name).replace(/^\.\//, '').replace(/^\//, '');
+        let factory;
+        try {
+            // Compiling the wrapper runs none of the submitted code
+            factory = new vm.Script(
+                `(function (exports, require, module, __filename, __dirname) {${files[name]}\n})`,
+                { filename: key }
+            ).runInContext(context, { timeout: timeoutMs });
+        } catch (e) {
+            // Requiring a file that does not compile raises its error, as in Node
+            factory = new vm.Script(
+                `(function () { throw new SyntaxError(${JSON.stringify(describe(e).replace(/^SyntaxError: /, ''))}); })`
+            ).runInContext(context, { timeout: timeoutMs });
+        }
+        handle.register(key, factory);
+    }
+    return { context, handle };
+}
+
+function run(sandbox, source, filename, timeoutMs) {
+    return new vm.Script(source, { filename }).runInContext(sandbox.context, { timeout: timeoutMs });
+}
+
+function evaluate(sandbox, source, filename, timeoutMs) {
+    const value = run(sandbox, source, filename, timeoutMs);
+    const thenable = (typeof value === 'object' && value !== null) || typeof value === 'function';
+    if (!thenable || typeof value.then !== 'function') return { settled: true, ok: true, value };
+
+    // Promises can only settle through the context's own microtask queue, which
+    // is drained after each evaluation; there are no timers or I/O to wait for.
+    const state = sandbox.handle.track(value);
+    run(sandbox, 'void 0', 'settle.js', timeoutMs);
+    return { settled: state.settled === true, ok: state.ok === true, value: state.value };
+}
+
+function output(sandbox) {
+    try {
+        const lines = JSON.parse(sandbox.handle.output());
+        return Array.isArray(lines) ? lines.filter(line => typeof line === 'string') : [];
+    } catch (e) {
+        return [];
+    }
+}
+
+function runCheck(sandbox, check, timeoutMs) {
+    if (check.type === 'js_output') {
+        const expected = String(check.value || '');
+        const passed = output(sandbox).some(line => line.includes(expected));
+        return { passed, message: passed ? `Output contains '${expected}'.` : `Output does not contain '${expected}'.` };
+    }
+    if (check.type === 'js_defines') {
+        const name = String(check.selector || '');
+        if (!/^[A-Za-z_$][\w$]*$/.test(name)) return { passed: false, message: `'${name}' is not a valid identifier.` };
+        const kind = String(run(sandbox, `typeof ${name}`, 'check.js', timeoutMs));
+        if (kind === 'undefined') return { passed: false, message: `'${name}' is not defined.` };
+        if (check.attribute_name && kind !== check.attribute_name) {
+            return { passed: false, message: `'${name}' is a ${kind}, not a ${check.attribute_name}.` };
+        }
+        return { passed: true, message: `'${name}' is defined.` };
+    }
+    if (check.type === 'js_assert') {
+        const expression = String(check.value || '');
+        const result = evaluate(sandbox, `(${expression}\n)`, 'check.js', timeoutMs);
+        if (!result.settled) return { passed: false, message: `Assertion '${expression}' never completed.` };
+        if (!result.ok) return { passed: false, message: `Assertion '${expression}' raised ${describe(result.value)}.` };
+        return result.value
+            ? { passed: true, message: `Assertion '${expression}' holds.` }
+            : { passed: false, message: `Assertion '${expression}' does not hold.` };
+    }
+    return { passed: false, message: `Unknown check type '${check.type}'.` };
+}
+
+function runJob(job) {
+    const timeoutMs = job.timeout_ms || 1000;
+    const files = job.files || {};
+    const sandbox = createSandbox(files, timeoutMs, job.mode === 'module');
+    let error = null;
+    try {
+        if (job.mode === 'module') {
+            run(sandbox, `require(${JSON.stringify(String(job.entry))})`, 'entry.js', timeoutMs);
+        } else {
+            // Plain scripts share one global scope, so assertions can call their functions
+            run(sandbox, files[job.entry], job.entry, timeoutMs);
+        }
+    } catch (e) {
+        error = describe(e);
+    }
+    const results = (job.checks || []).map(check => {
+        if (error !== null && check.type !== 'js_output') {
+            return { passed: false, message: `Your code raised ${error}.` };
+        }
+        try {
+            return runCheck(sandbox, check, timeoutMs);
+        } catch (e) {
+            return { passed: false, message: `Check failed with ${describe(e)}.` };
+        }
+    });
+    return { results, error, output: output(sandbox) };
+}
+
+const chunks = [];
+process.stdin.on('data', chunk => chunks.push(chunk));
+process.stdin.on('end', () => {
+    let response;
+    try {
+        response = runJob(JSON.parse(Buffer.concat(chunks).toString('utf8')));
+    } catch (e) {
+        response = { results: [], error: describe(e), output: [] };
+    }
+    process.stdout.write(JSON.stringify(response) + '\n');
+});
@@ -13,9 +13,8 @@ document.addEventListener('DOMContentLoaded', () => {
     const reviewContainer = document.getElementById('review-container');
 
     // State
-    let score = 0;
-    const answeredQuestions = new Set(); // Use a Set to track answered questions
     let userAnswers = {}; // Use an object to store {questionId: optionId}
+    let gradedResults = {}; // {questionId: {correct, correct_option_id}}, returned by submit_result
 
     // API helper function (no changes)
     async function apiCall(url, data) {
@@ -24,12 +23,17 @@ document.addEventListener('DOMContentLoaded', () => {
             headers: { 'Content-Type': 'application/json' },
             body: JSON.stringify(data),
         });
-        if (!response.ok) throw new Error(`HTTP error! status: ${response.status}`);
+        if (!response.ok) {
+            const error = new Error(`HTTP error! status: ${response.status}`);
+            error.status = response.status;
+            error.data = await response.json().catch(() => ({}));
+            throw error;
+        }
         return response.json();
     }
 
     function updateProgress() {
-        const answeredCount = answeredQuestions.size;
+        const answeredCount = Object.keys(userAnswers).length;
         const progressPercentage = (answeredCount / totalQuestions) * 100;
         
         progressBar.style.width = `${progressPercentage}%`;
@@ -40,54 +44,48 @@ document.addEventListener('DOMContentLoaded', () => {
         submitBtn.disabled = answeredCount !== totalQuestions;
     }
 
-    // Use event delegation to handle clicks on any option button
-    questionArea.addEventListener('click', async (event) => {
+    // Use event delegation to handle clicks on any option button.
+    // Answers are only recorded here; the whole quiz is graded in one request on submit.
+    questionArea.addEventListener('click', (event) => {
         // Only act on clicks on the option buttons
         if (!event.target.matches('.options-container .btn')) return;
 
         const selectedButton = event.target;
         const questionCard = selectedButton.closest('.question-card');
         const questionId = parseInt(questionCard.dataset.questionId);
-        
-        // If this question has already been answered, do nothing
-        if (answeredQuestions.has(questionId)) return;
-
         const optionId = parseInt(selectedButton.dataset.optionId);
         
-        // Store the user's answer for the review
+        // Store the user's answer; it can be changed until the quiz is submitted
         userAnswers[questionId] = optionId;
 
+        questionCard.querySelectorAll('.options-container .btn').forEach(btn => {
+            btn.classList.remove('btn-primary');
+            btn.classList.add('btn-outline-primary');
+        });
+        selectedButton.classList.replace('btn-outline-primary', 'btn-primary');
+
+        updateProgress();
+    });
+
+    submitBtn.addEventListener('click', async () => {
+        submitBtn.disabled = true;
+
+        // The server grades the answers and records the attempt in one request
+        let result;
         try {
-            const result = await apiCall('/api/quiz/check_answer', { question_id: questionId, option_id: optionId });
-            
-            // Mark the question as answered
-            answeredQuestions.add(questionId);
-
-            if (result.correct) {
-                score++;
-                selectedButton.classList.replace('btn-outline-primary', 'btn-success');
+            result = await apiCall('/api/quiz/submit_result', { quiz_id: quizId, answers: userAnswers });
+        } catch (error) {
+            console.error('Error submitting results:', error);
+            if (error.status === 429 && error.data && error.data.error) {
+                alert(error.data.error);
             } else {
-                selectedButton.classList.replace('btn-outline-primary', 'btn-danger');
-                // Highlight the correct answer in green
-                const correctButton = questionCard.querySelector(`[data-option-id='${result.correct_option_id}']`);
-                if (correctButton) {
-                    correctButton.classList.replace('btn-outline-primary', 'btn-success');
-                }
+                alert('Could not submit your answers. Please refresh and try again.');
             }
-            
-            // Disable all buttons within this specific question card
-            const allButtonsInCard = questionCard.querySelectorAll('.options-container .btn');
-            allButtonsInCard.forEach(btn => btn.disabled = true);
-            
-            updateProgress();
-
-        } catch (error) {
-            console.error('Error checking answer:', error);
-            alert('Could not verify answer. Please refresh and try again.');
+            submitBtn.disabled = false;
+            return;
         }
-    });
 
-    submitBtn.addEventListener('click', async () => {
+        gradedResults = result.results;
         questionArea.style.display = 'none';
         submitBtn.style.display = 'none';
         resultsArea.style.display = 'block';
@@ -95,22 +93,14 @@ document.addEventListener('DOMContentLoaded', () => {
         progressBar.classList.add('bg-success');
         progressBar.innerText = `Complete!`;
 
-        resultSummary.innerText = `You scored ${score} out of ${totalQuestions}.`;
+        resultSummary.innerText = `You scored ${result.score} out of ${result.total}.`;
         
-        try {
-            const result = await apiCall('/api/quiz/submit_result', { quiz_id: quizId, score: score });
-            
-            if (result.passed) {
-                resultFeedback.innerText = "Congratulations, you passed!";
-                resultFeedback.classList.add('alert-success');
-            } else {
-                resultFeedback.innerText = "You did not pass this time. Please review your answers or try again in 1 minute.";
-                resultFeedback.classList.add('alert-warning');
-            }
-        } catch (error) {
-            console.error('Error submitting results:', error);
-            resultFeedback.innerText = "There was an error saving your score.";
-            resultFeedback.classList.add('alert-danger');
+        if (result.passed) {
+            resultFeedback.innerText = "Congratulations, you passed!";
+            resultFeedback.classList.add('alert-success');
+        } else {
+            resultFeedback.innerText = "You did not pass this time. Please review your answers or try again in 1 minute.";
+            resultFeedback.classList.add('alert-warning');
         }
     });
 
@@ -120,18 +110,21 @@ document.addEventListener('DOMContentLoaded', () => {
         reviewArea.style.display = 'block';
         reviewContainer.innerHTML = '';
 
-        questionsWithAnswersData.forEach((question) => {
+        reviewQuestionsData.forEach((question) => {
             const questionCard = document.createElement('div');
             questionCard.classList.add('card', 'mb-3');
 
+            // The correct options are only known from the graded results of this attempt
+            const graded = gradedResults[question.id] || {};
             let optionsHtml = '<ul class="list-group list-group-flush">';
             question.options.forEach(option => {
                 let itemClass = '';
                 const userSelectedThis = (userAnswers[question.id] === option.id);
+                const isCorrect = (graded.correct_option_id === option.id);
 
-                if (option.is_correct) {
+                if (isCorrect) {
                     itemClass = 'list-group-item-success';
-                } else if (userSelectedThis && !option.is_correct) {
+                } else if (userSelectedThis && !isCorrect) {
                     itemClass = 'list-group-item-danger';
                 }
                 
@@ -13,7 +13,7 @@ document.addEventListener('DOMContentLoaded', () => {
         checkBtn.disabled = true;
         checkBtn.innerHTML = `
             <span class="spinner-border spinner-border-sm" role="status" aria-hidden="true"></span>
-            Checking...
+            <span>Checking...</span>
         `;
 
         try {
@@ -30,14 +30,23 @@ document.addEventListener('DOMContentLoaded', () => {
                 throw new Error(`Network response was not ok. Status: ${response.status}`);
             }
 
-            const data = await response.json();
+            let data = await response.json();
+            if (response.status === 202) {
+                // Queued grading: poll the job until a worker has graded it
+                checkBtn.lastElementChild.textContent = 'Waiting for grader...';
+                data = await waitForJob(data.poll_url);
+            }
             
             // Update the UI based on the results from the API
             updateChecklist(data.results, data.is_complete);
 
         } catch (error) {
             console.error('Validation Error:', error);
-            alert('An error occurred while checking your code. Please try again.');
+            if (error.timedOut) {
+                alert('Grading is taking longer than expected. Please try again in a moment.');
+            } else {
+                alert('An error occurred while checking your code. Please try again.');
+            }
         } finally {
             // Re-enable the button
             checkBtn.disabled = false;
@@ -45,15 +54,38 @@ document.addEventListener('DOMContentLoaded', () => {
         }
     });
 
+    // Give up on a queued job after this many polls (one per second)
+    const MAX_JOB_POLLS = 120;
+
+    async function waitForJob(pollUrl) {
+        for (let poll = 0; poll < MAX_JOB_POLLS; poll++) {
+            await new Promise(resolve => setTimeout(resolve, 1000));
+            const response = await fetch(pollUrl);
+            if (!response.ok) {
+                throw new Error(`Network response was not ok. Status: ${response.status}`);
+            }
+            const job = await response.json();
+            if (job.status === 'done') {
+                return job;
+            }
+            if (job.status === 'failed') {
+                throw new Error(job.error);
+            }
+        }
+        const error = new Error('Grading did not finish in time.');
+        error.timedOut = true;
+        throw error;
+    }
+
     function updateChecklist(results, is_complete) {
         const statusIcons = checklist.querySelectorAll('.status-icon'); // Query inside to get latest
-        results.forEach((isCorrect, index) => {
+        results.forEach((result, index) => {
             const icon = statusIcons[index];
             if (icon) {
                 // Remove all old status classes
                 icon.classList.remove('bi-circle', 'bi-check-circle-fill', 'bi-x-circle-fill');
                 
-                if (isCorrect) {
+                if (result.passed) {
                     icon.classList.add('bi-check-circle-fill');
                     icon.style.color = 'green';
                 } else {
@@ -0,0 +1,76 @@
+import shutil
+
+import pytest
+
+from app import CodeRunnerPool, RequirementSpec, code_runners, validate_backend_code, validate_javascript_code
+
+pytestmark = pytest.mark.skipif(shutil.which(code_runners.node) is None, reason="Node.js is not installed")
+
+PRINTS_DONE = RequirementSpec('Prints done', 'js_output', None, None, 'done')
+
+
+def test_small_typed_array_allocation_runs():
+    results = validate_javascript_code("new Uint8Array(8 * 1024 * 1024).fill(1);\nconsole.log('done');", [PRINTS_DONE])
+    assert results[0]['passed'], results[0]['message']
+
+
+def test_large_typed_array_allocation_is_rejected():
+    # Typed arrays live outside the V8 heap, so only the OS data limit stops this
+    code = "const buffer = new Uint8Array(300 * 1024 * 1024).fill(1);\nconsole.log('done');"
+    results = validate_javascript_code(code, [PRINTS_DONE])
+    assert not results[0]['passed']
+
+
+def test_unsupported_node_flag_is_reported_clearly():
+    pool = CodeRunnerPool(size=1, node=code_runners.node, harness=code_runners.harness, timeout=5, cpu_seconds=1,
+                          memory_mb=64, permission_flag='--no-such-permission-flag')
+    with pytest.raises(RuntimeError, match='rejected the code runner flags'):
+        pool.run({'main.js': "console.log('done')"}, 'main.js', [])
+
+
+def test_backend_file_names_keep_leading_dots():
+    files = {'index.js': "module.exports = require('./.hidden.js');", './.hidden.js': "module.exports = 42;"}
+    requirement = RequirementSpec('Loads the hidden file', 'js_assert', None, None, "require('./index.js') === 42")
+    results = validate_backend_code(files, [requirement])
+    assert results[0]['passed'], results[0]['message']
+
+
+def test_backend_file_names_outside_the_submission_are_rejected():
+    requirement = RequirementSpec('Anything', 'js_assert', None, None, 'true')
+    results = validate_backend_code({'index.js': '', '../x.js': ''}, [requirement])
+    assert not results[0]['passed']
+    assert "Invalid file name '../x.js'" in results[0]['message']
+
+
+# Reaching the runner's own Object.prototype would let the submission rewrite the JSON the runner sends back
+POISON = """
+this.constructor.prototype.toJSON = () => ({ results: [{ passed: true, message: 'forged' }], error: null, output: [] });
+"""
+
+
+def test_submission_cannot_forge_its_own_results():
+    results = validate_javascript_code(POISON, [RequirementSpec('Never holds', 'js_assert', None, None, 'false')])
+    assert not results[0]['passed']
+    assert results[0]['message'] != 'forged'
+
+
+def test_submission_cannot_affect_a_later_submission():
+    validate_javascript_code(POISON, [RequirementSpec('Anything', 'js_assert', None, None, 'true')])
+    results = validate_javascript_code('const x = 1;', [RequirementSpec('Never holds', 'js_assert', None, None, 'false')])
+    assert not results[0]['passed']
+
+
+def test_context_functions_are_not_host_functions():
+    check = RequirementSpec('In-context console', 'js_assert', None, None,
+                            'Object.getPrototypeOf(console.log) === Function.prototype && this.constructor !== undefined')
+    results = validate_javascript_code('const x = 1;', [check])
+    assert results[0]['passed'], results[0]['message']
+
+
+def test_cpu_limit_covers_the_whole_submission():
+    # Each check stays under the per-evaluation timeout; together they exceed the submission's CPU budget
+    code = "function spin(ms) { const end = Date.now() + ms; while (Date.now() < end) {} }"
+    checks = [RequirementSpec(f'Spin {i}', 'js_assert', None, None, f'(spin({int(code_runners.cpu_seconds * 600)}), true)')
+              for i in range(4)]
+    results = validate_javascript_code(code, checks)
+    assert not all(result['passed'] for result in results)
@@ -0,0 +1,20 @@
+import pytest
+from sqlalchemy import create_engine
+
+from app import HOT_QUERY_PLANS, db, explain_uses_index
+
+
+@pytest.fixture(scope='module')
+def connection():
+    # A throwaway database with the schema declared by the models, indexes included
+    engine = create_engine('sqlite://')
+    db.metadata.create_all(engine)
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+@pytest.mark.parametrize('name, sql', HOT_QUERY_PLANS, ids=[name for name, _ in HOT_QUERY_PLANS])
+def test_hot_query_uses_index(connection, name, sql):
+    uses_index, plan = explain_uses_index(sql, connection)
+    assert uses_index, f"{name} is not served by an index: {plan}"